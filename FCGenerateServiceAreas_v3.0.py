@@ -4,30 +4,751 @@ Author: Alex McCullough
 What: A QGIS plugin to generate tiered accessibility maps based on cost of access. 
 Cost is calculated based on distance (cost per mile driven) and time, which is governed by speed limit data
 in the base road map data layers. The output is geared specifically for distributors running delivery trucks. 
+
+Run: load as a Processing script (algorithm id script:FCServiceAreaV30), run the file directly with
+    qgis_process run FCGenerateServiceAreas_v3.0.py -- MainRouteSketch=routes.gpkg RoadNetwork=roads.gpkg ...
+or headless from a QGIS-enabled Python:
+    python FCGenerateServiceAreas_v3.0.py --routes routes.gpkg --roads roads.gpkg --output service_areas.gpkg
 """
 
-import processing
-import gc
-from qgis.core import QgsProcessing
-from qgis.core import QgsProcessingAlgorithm
-from qgis.core import QgsProcessingParameterFeatureSource
-from qgis.core import QgsProcessingMultiStepFeedback
-from qgis.core import QgsProcessingParameterFeatureSink
-from qgis.core import QgsProcessingParameterNumber
-from qgis.core import QgsProcessingParameterString
-from qgis.core import QgsExpression
-from qgis.processing import alg
-from qgis.core import QgsProject
-from qgis.core import QgsVectorLayer
-from qgis.core import edit
-from qgis.core import QgsField
-from PyQt5.QtCore import QVariant
-from qgis.utils import iface
-from qgis.core import QgsFeatureRequest
+import time
+# Headless startup is timed from before the module imports, so it includes their cost
+FC_STARTUP_TIME = time.perf_counter()
+
+import gc  # noqa: E402
+import os  # noqa: E402
+import json  # noqa: E402
+import shutil  # noqa: E402
+import hashlib  # noqa: E402
+import contextlib  # noqa: E402
+import sys  # noqa: E402
+import types  # noqa: E402
+try:
+    import resource
+except ImportError:
+    # Windows: no getrusage, peak RSS is reported as unavailable
+    resource = None
+import heapq  # noqa: E402
+import numpy as np  # noqa: E402
+try:
+    import processing
+except ImportError:
+    # Standalone interpreters don't have QGIS's bundled plugins folder (home of processing) on sys.path
+    import qgis
+    sys.path.append(os.path.join(os.path.dirname(os.path.dirname(qgis.__file__)), 'plugins'))
+    import processing
+from qgis.core import QgsProcessing  # noqa: E402
+from qgis.core import QgsProcessingAlgorithm  # noqa: E402
+from qgis.core import QgsProcessingParameterFeatureSource  # noqa: E402
+from qgis.core import QgsProcessingMultiStepFeedback  # noqa: E402
+from qgis.core import QgsProcessingParameterFeatureSink  # noqa: E402
+from qgis.core import QgsProcessingParameterNumber  # noqa: E402
+from qgis.core import QgsProcessingParameterString  # noqa: E402
+from qgis.core import QgsExpression  # noqa: E402
+from qgis.core import QgsProject  # noqa: E402
+from qgis.core import QgsVectorLayer  # noqa: E402
+from qgis.core import QgsField  # noqa: E402
+from PyQt5.QtCore import QVariant  # noqa: E402
+from PyQt5.QtCore import QObject  # noqa: E402
+from PyQt5.QtCore import QCoreApplication  # noqa: E402
+from PyQt5.QtCore import Qt  # noqa: E402
+from PyQt5.QtCore import pyqtSignal  # noqa: E402
+from PyQt5.QtCore import pyqtSlot  # noqa: E402
+from qgis.core import QgsFeatureRequest  # noqa: E402
+from qgis.core import QgsProcessingParameterEnum  # noqa: E402
+from qgis.core import QgsProcessingException  # noqa: E402
+from qgis.core import QgsProcessingUtils  # noqa: E402
+from qgis.core import QgsFeature  # noqa: E402
+from qgis.core import QgsFeatureSink  # noqa: E402
+from qgis.core import QgsFeatureSource  # noqa: E402
+from qgis.core import QgsVectorDataProvider  # noqa: E402
+from qgis.core import QgsFields  # noqa: E402
+from qgis.core import QgsGeometry  # noqa: E402
+from qgis.core import QgsPointXY  # noqa: E402
+from qgis.core import QgsRectangle  # noqa: E402
+from qgis.core import QgsWkbTypes  # noqa: E402
+from qgis.core import QgsProcessingParameterBoolean  # noqa: E402
+from qgis.core import QgsProcessingFeatureSourceDefinition  # noqa: E402
+from qgis.core import QgsProviderRegistry  # noqa: E402
+from qgis.core import QgsCoordinateTransform  # noqa: E402
+from qgis.core import QgsPoint  # noqa: E402
+from qgis.core import QgsProcessingParameterField  # noqa: E402
+from qgis.core import NULL  # noqa: E402
+from qgis.core import QgsProcessingFeedback  # noqa: E402
+from qgis.core import QgsProcessingParameterRasterDestination  # noqa: E402
+from qgis.core import QgsProcessingParameterFileDestination  # noqa: E402
+from qgis.core import Qgis  # noqa: E402
+from qgis.core import QgsApplication  # noqa: E402
+# PyQt5.QtCore comes with qgis.core anyway. Imports only some modes need (GDAL/OGR, qgis.analysis,
+# multiprocessing) are done in the functions that use them, so they don't slow down every start
+
+
+try:
+    FC_SCRIPT_PATH = os.path.abspath(__file__)
+except NameError:
+    # The Script Editor's Run exec()s the source, without a file behind it
+    FC_SCRIPT_PATH = None
+FC_CACHE_DIR = os.path.join(
+    os.path.dirname(FC_SCRIPT_PATH) if FC_SCRIPT_PATH else QgsApplication.qgisSettingsDirPath(), 'fc_cache')
+FC_GRAPHCACHE_DIR = os.path.join(FC_CACHE_DIR, 'graphs')
+FC_COSTCACHE_DIR = os.path.join(FC_CACHE_DIR, 'costs')
+FC_COSTCACHE_MAX_ENTRIES = 64
+FC_RESULTCACHE_DIR = os.path.join(FC_CACHE_DIR, 'results')
+FC_WORKER_MODULE = 'fc_servicearea_worker'
+
+# Graph and edge costs shared with forked search workers, set only while a process pool is running
+_FC_WORKER_GRAPH = None
+_FC_WORKER_EDGE_COST = None
+
+
+def searchRouteNodeCostsWorker(route_id, source_nodes, cutoff, reach, graph=None, edge_cost=None):
+    """
+    Multi-source search for one route of a batch, on the subgraph within reach of the route's nodes only.
+    Returns (route_id, reached node indices, their costs).
+    """
+    if graph is None:
+        graph = _FC_WORKER_GRAPH
+        edge_cost = _FC_WORKER_EDGE_COST
+    node_cost = graph.multiSourceDijkstra(source_nodes, cutoff, edge_cost, reach=reach)
+    reached = np.flatnonzero(np.isfinite(node_cost))
+    return route_id, reached, node_cost[reached]
+
+
+def searchTileNodeCostsWorker(tile_idx, bounds, source_nodes, cutoff, graph=None, edge_cost=None):
+    """
+    Multi-source search for one tile, on the subgraph of nodes within bounds (xmin, ymin, xmax, ymax) only.
+    Returns (tile_idx, reached node indices of the full graph, their costs).
+    """
+    if graph is None:
+        graph = _FC_WORKER_GRAPH
+        edge_cost = _FC_WORKER_EDGE_COST
+    x0, y0, x1, y1 = bounds
+    node_x = graph.node_xy[:, 0]
+    node_y = graph.node_xy[:, 1]
+    subgraph, nodes, edges = graph.subgraph((node_x >= x0) & (node_x <= x1) & (node_y >= y0) & (node_y <= y1))
+    node_cost = subgraph.multiSourceDijkstra(
+        np.searchsorted(nodes, source_nodes), cutoff, edge_cost[edges] if edge_cost is not None else None)
+    reached = np.flatnonzero(np.isfinite(node_cost))
+    return tile_idx, nodes[reached], node_cost[reached]
+
+
+def registerWorkerModule():
+    """
+    QGIS loads processing scripts under their file name (which holds a dot, here) without registering them in
+    sys.modules, so pickle can't resolve the workers by reference. Expose them under a stable module name.
+    """
+    module = sys.modules.get(FC_WORKER_MODULE)
+    if module is None:
+        module = sys.modules[FC_WORKER_MODULE] = types.ModuleType(FC_WORKER_MODULE)
+    for worker in (searchRouteNodeCostsWorker, searchTileNodeCostsWorker):
+        setattr(module, worker.__name__, worker)
+        worker.__module__ = FC_WORKER_MODULE
+
+
+class FCRoadGraph:
+    """
+    Undirected road graph in CSR form, built once from a line layer.
+
+    Every line vertex becomes a node (vertices closer than the coordinate precision are merged), and every
+    pair of consecutive vertices becomes an edge that is stored in both directions of the adjacency arrays.
+    Costs are kept per edge (edge_len, plus the road's speed in edge_speed, nan where it has none) and
+    mapped onto the adjacency through edge_ids, so alternative edge costs can be swapped in without
+    rebuilding the graph. node_line_ends counts the road lines starting or ending at each node.
+    """
+
+    CACHE_VERSION = 3
+    CACHE_ARRAYS = ('node_xy', 'edge_u', 'edge_v', 'edge_len', 'indptr', 'indices', 'edge_ids', 'edge_speed',
+                    'node_line_ends')
+
+    def __init__(self, node_xy, edge_u, edge_v, edge_len, indptr, indices, edge_ids, edge_speed=None,
+                 node_line_ends=None):
+        self.node_xy = node_xy
+        self.edge_u = edge_u
+        self.edge_v = edge_v
+        self.edge_len = edge_len
+        self.indptr = indptr
+        self.indices = indices
+        self.edge_ids = edge_ids
+        self.edge_speed = edge_speed if edge_speed is not None else np.full(len(edge_u), np.nan)
+        self.node_line_ends = (node_line_ends if node_line_ends is not None
+                               else np.zeros(len(node_xy), dtype=np.int64))
+        self.edge_costs = {}
+        self.cache_fingerprint = None
+
+    @classmethod
+    def fromEdges(
+        cls, node_xy, edge_u, edge_v, edge_len, edge_speed=None, node_line_ends=None
+    ):
+        node_count = len(node_xy)
+        edge_count = len(edge_u)
+
+        src = np.concatenate((edge_u, edge_v))
+        dst = np.concatenate((edge_v, edge_u))
+        eid = np.concatenate((np.arange(edge_count, dtype=np.int64), np.arange(edge_count, dtype=np.int64)))
+        order = np.argsort(src, kind='stable')
+
+        indptr = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=node_count), out=indptr[1:])
+
+        return cls(node_xy, edge_u, edge_v, edge_len, indptr, dst[order], eid[order], edge_speed, node_line_ends)
+
+    @classmethod
+    def fromLineLayer(
+        cls, layer, feedback=None, precision=3, speed_field=None
+    ):
+        """
+        speed_field names the numeric road speed (mph) attribute; every edge of a road gets the road's speed.
+        """
+        node_ids = {}
+        node_xy = []
+        edge_u = []
+        edge_v = []
+        edge_speed = []
+        line_ends = []
+        feat_total = max(layer.featureCount(), 1)
+
+        idx_speed = layer.fields().lookupField(speed_field) if speed_field else -1
+        request = QgsFeatureRequest()
+        if idx_speed >= 0:
+            request.setSubsetOfAttributes([idx_speed])
+        else:
+            request.setNoAttributes()
+
+        for i, f in enumerate(layer.getFeatures(request)):
+            if feedback is not None:
+                if feedback.isCanceled():
+                    break
+                if i % 1000 == 0:
+                    feedback.setProgress(100.0 * i / feat_total)
+
+            geom = f.geometry()
+            if geom.isNull() or geom.isEmpty():
+                continue
+
+            speed = f[idx_speed] if idx_speed >= 0 else None
+            try:
+                speed = float(speed) if speed is not None and speed != NULL else np.nan
+            except (TypeError, ValueError):
+                speed = np.nan
+
+            lines = geom.asMultiPolyline() if geom.isMultipart() else [geom.asPolyline()]
+            for line in lines:
+                node_prev = None
+                node_first = None
+                for pt in line:
+                    key = (round(pt.x(), precision), round(pt.y(), precision))
+                    node = node_ids.get(key)
+                    if node is None:
+                        node = node_ids[key] = len(node_xy)
+                        node_xy.append(key)
+                    if node_prev is not None and node_prev != node:
+                        edge_u.append(node_prev)
+                        edge_v.append(node)
+                        edge_speed.append(speed)
+                    if node_first is None:
+                        node_first = node
+                    node_prev = node
+                if node_first is not None and node_first != node_prev:
+                    line_ends.extend((node_first, node_prev))
+
+        node_xy = np.array(node_xy, dtype=np.float64).reshape(-1, 2)
+        edge_u = np.array(edge_u, dtype=np.int64)
+        edge_v = np.array(edge_v, dtype=np.int64)
+        edge_len = np.hypot(node_xy[edge_u, 0] - node_xy[edge_v, 0], node_xy[edge_u, 1] - node_xy[edge_v, 1])
+
+        return cls.fromEdges(node_xy, edge_u, edge_v, edge_len, np.array(edge_speed, dtype=np.float64),
+                             np.bincount(np.array(line_ends, dtype=np.int64), minlength=len(node_xy)))
+
+    @classmethod
+    def load(
+        cls, cache_dir, cache_key
+    ):
+        """
+        Opens a cached graph as memory-mapped arrays, or returns None if it is missing or was built for a
+        different cache_key.
+        """
+        try:
+            with open(os.path.join(cache_dir, 'meta.json')) as fp:
+                if json.load(fp) != cache_key:
+                    return None
+            arrays = [np.load(os.path.join(cache_dir, name + '.npy'), mmap_mode='r') for name in cls.CACHE_ARRAYS]
+        except (OSError, ValueError):
+            return None
+        graph = cls(*arrays)
+        graph.cache_fingerprint = hashlib.sha1(json.dumps(cache_key, sort_keys=True).encode('utf-8')).hexdigest()
+        return graph
+
+    def save(
+        self, cache_dir, cache_key
+    ):
+        # Write next to the target and swap in, so a crashed run never leaves a half-written entry behind
+        cache_dir_tmp = cache_dir + '.tmp'
+        shutil.rmtree(cache_dir_tmp, ignore_errors=True)
+        os.makedirs(cache_dir_tmp)
+        for name in self.CACHE_ARRAYS:
+            np.save(os.path.join(cache_dir_tmp, name + '.npy'), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(cache_dir_tmp, 'meta.json'), 'w') as fp:
+            json.dump(cache_key, fp)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.replace(cache_dir_tmp, cache_dir)
+
+    def fingerprint(self):
+        """
+        Identity of the network: the cache key for graphs opened from the graph cache, otherwise a hash of
+        the node and edge arrays.
+        """
+        if self.cache_fingerprint is None:
+            h = hashlib.sha1()
+            for name in ('node_xy', 'edge_u', 'edge_v', 'edge_len', 'edge_speed'):
+                h.update(np.ascontiguousarray(getattr(self, name)).tobytes())
+            self.cache_fingerprint = h.hexdigest()
+        return self.cache_fingerprint
+
+    def subgraph(
+        self, node_mask
+    ):
+        """
+        Graph of the nodes in node_mask and the edges between them. Returns (subgraph, the subgraph nodes'
+        indices in this graph, the subgraph edges' indices in this graph).
+        """
+        nodes = np.flatnonzero(node_mask)
+        edges = np.flatnonzero(node_mask[self.edge_u] & node_mask[self.edge_v])
+        subgraph = FCRoadGraph.fromEdges(
+            self.node_xy[nodes],
+            np.searchsorted(nodes, self.edge_u[edges]),
+            np.searchsorted(nodes, self.edge_v[edges]),
+            self.edge_len[edges],
+            self.edge_speed[edges],
+            self.node_line_ends[nodes]
+        )
+        return subgraph, nodes, edges
+
+    def junctionNodes(self):
+        """
+        Indices of the nodes where roads meet, as native:lineintersections finds them on a noded network:
+        three or more edges, or the shared end of two or more road lines (roads split end to end at county
+        lines or attribute changes).
+        """
+        return np.flatnonzero((np.diff(self.indptr) >= 3) | (self.node_line_ends >= 2))
+
+    def nodesWithinReach(
+        self, source_nodes, reach
+    ):
+        """
+        Mask of the nodes within straight-line distance reach of any source node, a little generously: nodes
+        are tested by reach-sized grid cell, every cell next to a source's cell counts. No path that stays
+        within reach (in meters) of the sources can leave the masked nodes.
+        """
+        cell_ij = np.floor(self.node_xy / reach).astype(np.int64)
+        cell_min = cell_ij.min(axis=0) - 1
+        dims = tuple(cell_ij.max(axis=0) - cell_min + 2)
+        offsets = np.array([(i, j) for i in (-1, 0, 1) for j in (-1, 0, 1)], dtype=np.int64)
+        near_ij = (np.unique(cell_ij[source_nodes], axis=0)[:, None, :] + offsets[None, :, :]).reshape(-1, 2)
+        near_cells = np.unique(np.ravel_multi_index((near_ij - cell_min).T, dims))
+        return np.isin(np.ravel_multi_index((cell_ij - cell_min).T, dims), near_cells)
+
+    def generalizedEdgeCost(
+        self, cost_per_mile, cost_per_hour, default_speed
+    ):
+        """
+        $ cost of every edge: cost_per_mile x miles + cost_per_hour x hours at the road's speed (mph), or at
+        default_speed where the road has no usable speed. Computed in one vectorized pass and kept per rate set.
+        """
+        key = (float(cost_per_mile), float(cost_per_hour), float(default_speed))
+        edge_cost = self.edge_costs.get(key)
+        if edge_cost is None:
+            edge_mi = self.edge_len / 1609.344
+            speed = np.where(np.isfinite(self.edge_speed) & (self.edge_speed > 0), self.edge_speed, default_speed)
+            edge_cost = self.edge_costs[key] = edge_mi * cost_per_mile + edge_mi / speed * cost_per_hour
+        return edge_cost
+
+    def nodeCount(self):
+        return len(self.node_xy)
+
+    def edgeCount(self):
+        return len(self.edge_u)
+
+    def nearestNodes(
+        self, points_xy, max_dist
+    ):
+        """
+        Returns the nearest node index for each (x, y) in points_xy, or -1 when no node is within max_dist.
+        Candidates come from a strip of nodes sorted by x, so each lookup only measures nodes near the point.
+        """
+        order = np.argsort(self.node_xy[:, 0], kind='stable')
+        xs = self.node_xy[order, 0]
+        result = np.full(len(points_xy), -1, dtype=np.int64)
+
+        for i, (x, y) in enumerate(points_xy):
+            lo, hi = np.searchsorted(xs, (x - max_dist, x + max_dist))
+            if lo == hi:
+                continue
+            cand = order[lo:hi]
+            d = np.hypot(self.node_xy[cand, 0] - x, self.node_xy[cand, 1] - y)
+            k = int(np.argmin(d))
+            if d[k] <= max_dist:
+                result[i] = cand[k]
+        return result
+
+    def multiSourceDijkstra(
+        self, source_nodes, cutoff, edge_cost=None, feedback=None, reach=None
+    ):
+        """
+        Cost from every node to its nearest source node, searched no further than cutoff.
+
+        Seeding the queue with every source at cost 0 is equivalent to a single search from a virtual
+        super-source joined to all sources by zero-cost edges, so one O(E log V) pass replaces one search
+        per source. Unreached nodes are left at inf.
+        """
+        for _, node_cost in self.iterateMultiSourceDijkstra(source_nodes, [cutoff], edge_cost, feedback, reach):
+            pass
+        return node_cost
+
+    def iterateMultiSourceDijkstra(
+        self, source_nodes, thresholds, edge_cost=None, feedback=None, reach=None
+    ):
+        """
+        Multi-source search that pauses at each of the ascending cost thresholds, the last one being the
+        cutoff. Yields (threshold index, node costs) as soon as every node up to that threshold is settled:
+        nodes costing more are still at inf in the yielded array.
+
+        The search keeps Python lists of the whole adjacency, so on a large (cached) network pass reach, the
+        farthest straight-line distance the cutoff allows: it then runs on the subgraph within reach of the
+        sources only, and its costs are mapped back onto this graph's nodes.
+        """
+        if reach is not None:
+            subgraph, nodes, edges = self.subgraph(self.nodesWithinReach(source_nodes, reach))
+            for pause, sub_cost in subgraph.iterateMultiSourceDijkstra(
+                    np.searchsorted(nodes, source_nodes), thresholds,
+                    edge_cost[edges] if edge_cost is not None else None, feedback):
+                node_cost = np.full(self.nodeCount(), np.inf)
+                node_cost[nodes] = sub_cost
+                yield pause, node_cost
+            return
+
+        if edge_cost is None:
+            edge_cost = self.edge_len
+        cutoff = thresholds[-1]
+
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        weights = edge_cost[self.edge_ids].tolist()
+        dist = [float('inf')] * self.nodeCount()
+
+        heap = []
+        for s in set(int(s) for s in source_nodes):
+            dist[s] = 0.0
+            heap.append((0.0, s))
+        heapq.heapify(heap)
+
+        def settledUpTo(threshold):
+            node_cost = np.array(dist, dtype=np.float64)
+            node_cost[node_cost > threshold] = np.inf
+            return node_cost
+
+        pause = 0
+        pause_cost = thresholds[0] if len(thresholds) > 1 else float('inf')
+        settled = 0
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            # Every node still queued costs at least d, so all costs up to the passed thresholds are final
+            while d > pause_cost:
+                yield pause, settledUpTo(thresholds[pause])
+                pause += 1
+                pause_cost = thresholds[pause] if pause < len(thresholds) - 1 else float('inf')
+            settled += 1
+            if feedback is not None and settled % 50000 == 0 and feedback.isCanceled():
+                break
+            for k in range(indptr[u], indptr[u + 1]):
+                nd = d + weights[k]
+                v = indices[k]
+                if nd < dist[v] and nd <= cutoff:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+
+        for pause in range(pause, len(thresholds)):
+            yield pause, settledUpTo(thresholds[pause])
+
+
+class FCStageTracker:
+    """
+    Per-stage instrumentation: wall time, CPU time, how far the stage raised the process peak RSS, input/output
+    feature counts and the bytes each stage's output took on disk (or, for memory layers, would have taken).
+    ru_maxrss only ever grows, so a stage that stays under an earlier stage's peak shows a rise of 0.
+
+    Sizes and feature counts are measured when the report is built, so they don't add to stage timings.
+    Disk-backed runs store their timings as the baseline that in-memory runs are compared against, per
+    baseline_key (the identity of the inputs and parameters): timings of other data say nothing about these.
+    Without a key only the bytes kept off disk are reported.
+    """
+
+    BASELINE_PATH = os.path.join(FC_CACHE_DIR, 'stage_baseline.json')
+    BASELINE_MAX_RUNS = 64
+
+    def __init__(self, in_memory, baseline_key=None):
+        self.in_memory = in_memory
+        self.baseline_key = baseline_key
+        self.stages = []
+        self.time_start = time.perf_counter()
+        self.time_started = time.time()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        record = {'stage': name, 'seconds': 0.0, 'cpu_seconds': 0.0, 'peak_rss_bytes': None,
+                  'peak_rss_delta_bytes': None, 'input': None, 'output': None}
+        time_start = time.perf_counter()
+        cpu_start = self.cpuTime()
+        peak_start = self.peakRss()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - time_start
+            record['cpu_seconds'] = self.cpuTime() - cpu_start
+            record['peak_rss_bytes'] = self.peakRss()
+            if peak_start is not None:
+                record['peak_rss_delta_bytes'] = record['peak_rss_bytes'] - peak_start
+            self.stages.append(record)
+
+    def cpuTime(self):
+        # Includes finished child processes, so pooled searches are counted too
+        cpu = time.process_time()
+        if resource is not None:
+            usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu += usage.ru_utime + usage.ru_stime
+        return cpu
+
+    def peakRss(self):
+        # Peak RSS of the process so far, not of any one stage
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    def getLayer(
+        self, context, layer_ref
+    ):
+        if isinstance(layer_ref, QgsVectorLayer):
+            return layer_ref
+        if not isinstance(layer_ref, str) or not layer_ref or layer_ref.startswith('/vsimem/'):
+            return None
+        layer = context.getMapLayer(layer_ref)
+        return layer if isinstance(layer, QgsVectorLayer) else None
+
+    def countFeatures(
+        self, context, layer_ref
+    ):
+        layer = self.getLayer(context, layer_ref)
+        return layer.featureCount() if layer is not None else None
+
+    def measureOutput(
+        self, context, record
+    ):
+        if 'bytes' in record:
+            return record['bytes'], record.get('in_memory', False)
+
+        output = record['output']
+        if not isinstance(output, str):
+            return 0, False
+
+        path = output.split('|')[0]
+        if os.path.isfile(path):
+            return os.path.getsize(path), False
+
+        layer = self.getLayer(context, output)
+        if layer is None or layer.dataProvider().name() != 'memory':
+            return 0, False
+
+        layer_bytes = 0
+        for f in layer.getFeatures():
+            layer_bytes += len(f.geometry().asWkb()) if f.hasGeometry() else 0
+            layer_bytes += sum(len(str(v)) for v in f.attributes())
+        return layer_bytes, True
+
+    def loadBaselines(self):
+        try:
+            with open(self.BASELINE_PATH) as fp:
+                baselines = json.load(fp)
+        except (OSError, ValueError):
+            return {}
+        # Drops entries of the older unkeyed format
+        return dict((k, v) for k, v in baselines.items() if isinstance(v, dict)) if isinstance(baselines, dict) else {}
+
+    def loadBaseline(self):
+        if self.baseline_key is None:
+            return {}
+        return self.loadBaselines().get(self.baseline_key, {})
+
+    def saveBaseline(self):
+        if self.baseline_key is None:
+            return
+        baselines = self.loadBaselines()
+        # Merged, so a short run (a result cache hit) doesn't drop the other stages' baselines; re-inserted
+        # last, so the oldest runs are the ones dropped
+        baseline = baselines.pop(self.baseline_key, {})
+        baseline.update((r['stage'], r['seconds']) for r in self.stages)
+        baselines[self.baseline_key] = baseline
+        baselines = dict(list(baselines.items())[-self.BASELINE_MAX_RUNS:])
+        try:
+            os.makedirs(FC_CACHE_DIR, exist_ok=True)
+            with open(self.BASELINE_PATH, 'w') as fp:
+                json.dump(baselines, fp)
+        except OSError:
+            pass
+
+    def report(
+        self, context, model_feedback, report_path=None, metadata=None
+    ):
+        """
+        Logs the per-stage summary table and, when report_path is given, writes the same data as JSON.
+        """
+        baseline = self.loadBaseline() if self.in_memory else {}
+        bytes_avoided_total = 0
+        seconds_saved_total = 0.0
+        stages_report = []
+
+        model_feedback.pushInfo('%-40s %9s %9s %9s %10s %10s %12s %9s' % (
+            'stage', 'wall (s)', 'cpu (s)', '+rss (MB)', 'in feats', 'out feats', 'bytes', 'saved (s)'))
+        for record in self.stages:
+            record_bytes, record_in_memory = self.measureOutput(context, record)
+            entry = {
+                'stage': record['stage'],
+                'wall_seconds': record['seconds'],
+                'cpu_seconds': record['cpu_seconds'],
+                'process_peak_rss_bytes': record['peak_rss_bytes'],
+                'peak_rss_delta_bytes': record['peak_rss_delta_bytes'],
+                'input_features': record.get('input_features', self.countFeatures(context, record['input'])),
+                'output_features': record.get('output_features', self.countFeatures(context, record['output'])),
+                'temp_file_bytes': 0 if record_in_memory else record_bytes,
+                'in_memory_bytes': record_bytes if record_in_memory else 0,
+                'seconds_saved': None
+            }
+            if record_in_memory:
+                bytes_avoided_total += record_bytes
+                if record['stage'] in baseline:
+                    entry['seconds_saved'] = baseline[record['stage']] - record['seconds']
+                    seconds_saved_total += entry['seconds_saved']
+            stages_report.append(entry)
+
+            model_feedback.pushInfo('%-40s %9.2f %9.2f %9s %10s %10s %12s %9s' % (
+                entry['stage'][:40],
+                entry['wall_seconds'],
+                entry['cpu_seconds'],
+                '%.0f' % (entry['peak_rss_delta_bytes'] / 1048576.0) if entry['peak_rss_delta_bytes'] is not None
+                else '-',
+                entry['input_features'] if entry['input_features'] is not None else '-',
+                entry['output_features'] if entry['output_features'] is not None else '-',
+                '%d%s' % (record_bytes, ' (mem)' if record_in_memory else ''),
+                '%.2f' % entry['seconds_saved'] if entry['seconds_saved'] is not None else ''))
+
+        total_seconds = time.perf_counter() - self.time_start
+        model_feedback.pushInfo('Total: %.2f s, process peak RSS %s' % (
+            total_seconds, '%.0f MB' % (self.peakRss() / 1048576.0) if resource is not None else 'unavailable'))
+        if self.in_memory:
+            model_feedback.pushInfo('In-memory pipeline: %d bytes not written to disk, %s' % (
+                bytes_avoided_total,
+                '%.2f s saved vs last disk-backed run of the same inputs' % seconds_saved_total if baseline
+                else 'no disk-backed run of the same inputs recorded yet'))
+        else:
+            self.saveBaseline()
+
+        if report_path:
+            with open(report_path, 'w') as fp:
+                json.dump(dict(metadata or {}, total_seconds=total_seconds, in_memory=self.in_memory,
+                               stages=stages_report), fp, indent=2, default=str)
+
+
+class FCTierPreview(QObject):
+    """
+    Map canvas preview of progressive tiers. The algorithm runs in Processing's background task, so tiers are
+    handed over with queued signals and the preview layer is only ever touched on the GUI thread.
+    """
+
+    tierReady = pyqtSignal(object)
+    finished = pyqtSignal()
+    # Previews between create() and remove(). The algorithm lets go of its preview when it returns, but the
+    # object lives in the GUI thread and must outlive the queued tiers and finished signal it still has to run
+    active = set()
+
+    def __init__(self, fields, crs, layer_tree_group):
+        super().__init__()
+        self.fields = fields
+        self.crs = crs
+        self.layer_tree_group = layer_tree_group
+        self.layer = None
+
+    @classmethod
+    def create(
+        cls, fields, crs, layer_tree_group
+    ):
+        """
+        Preview bound to the GUI thread, or None without a QGIS GUI. layer_tree_group is called on the GUI
+        thread for the group the preview layer goes into.
+        """
+        from qgis.utils import iface
+        if iface is None:
+            return None
+        preview = cls(fields, crs, layer_tree_group)
+        preview.moveToThread(QCoreApplication.instance().thread())
+        preview.tierReady.connect(preview.addTier, Qt.QueuedConnection)
+        preview.finished.connect(preview.remove, Qt.QueuedConnection)
+        cls.active.add(preview)
+        return preview
+
+    @pyqtSlot(object)
+    def addTier(self, feature):
+        if self.layer is None:
+            self.layer = QgsVectorLayer('MultiPolygon', 'Service Areas (in progress)', 'memory')
+            self.layer.setCrs(self.crs)
+            self.layer.dataProvider().addAttributes(self.fields.toList())
+            self.layer.updateFields()
+            QgsProject.instance().addMapLayer(self.layer, False)
+            self.layer_tree_group().insertLayer(0, self.layer)
+        self.layer.dataProvider().addFeatures([feature])
+        self.layer.updateExtents()
+        self.layer.triggerRepaint()
+
+    @pyqtSlot()
+    def remove(self):
+        # The finished ServiceAreas output is loaded in its place
+        if self.layer is not None:
+            QgsProject.instance().removeMapLayer(self.layer.id())
+            self.layer = None
+        self.deleteLater()
+        FCTierPreview.active.discard(self)
 
 
 class FCServiceAreaV30(QgsProcessingAlgorithm):
 
+    ENGINE_QNEAT3 = 0
+    ENGINE_MULTISOURCE = 1
+    ENGINE_OPTIONS = [
+        'QNEAT3 isochrones (one search per route point)',
+        'Built-in multi-source network search (one search for all route points)'
+    ]
+    COST_DISTANCE = 0
+    COST_GENERALIZED = 1
+    COST_OPTIONS = [
+        'Distance (shortest path)',
+        'Generalized cost ($ per mile + $ per hour at road speed, built-in engine)'
+    ]
+    OVERLAP_NATIVE = 0
+    OVERLAP_SAGA = 1
+    OVERLAP_OPTIONS = [
+        'Native minimum-tier union',
+        'SAGA polygon self-intersection (legacy, needs SAGA)'
+    ]
+    ROUTEPOINT_SNAP_M = 50
+    CLIP_GRID_CELLS = 64
+    # Parameters that only change how a result is computed or cached, not the result
+    # UseGraphCache stays in the key: a cached graph is the whole network, an uncached one is clipped to the
+    # route buffer, so paths leaving the buffer can make their results differ
+    RESULTCACHE_IGNORED_PARAMS = ('MainRouteSketch', 'RoadNetwork', 'InMemoryPipeline', 'ReuseTierCosts',
+                                  'UseResultCache', 'ResultCacheSizeMB', 'PreviewOnCanvas')
+    SCRIPT_VERSION = '3.0'
+
     def initAlgorithm(self, config=None):
 
         self.addParameter(QgsProcessingParameterFeatureSource(name='MainRouteSketch', description='Route Sketch',
@@ -43,15 +764,121 @@ class FCServiceAreaV30(QgsProcessingAlgorithm):
         self.addParameter(QgsProcessingParameterString(name='TierMinimums', description='Tier Minimums (as $ string, separated by | )',
                           optional=True, defaultValue="$150|$200|$275|$350|$425|$500|$600|$700|$800"))
         self.addParameter(QgsProcessingParameterNumber(name='CostAvgSpeed', description='Average Driving Speed',
-                          optional=False, type=QgsProcessingParameterNumber.Integer, defaultValue=55))
+                          optional=False, type=QgsProcessingParameterNumber.Integer, minValue=1, defaultValue=55))
+        self.addParameter(QgsProcessingParameterEnum(name='CostModel', description='Cost Model',
+                          options=self.COST_OPTIONS, optional=False, defaultValue=self.COST_DISTANCE))
+        self.addParameter(QgsProcessingParameterNumber(name='CostPerMile', description='Driving Cost per Mile ($)',
+                          optional=False, type=QgsProcessingParameterNumber.Double, minValue=0, defaultValue=2))
+        self.addParameter(QgsProcessingParameterNumber(name='CostPerHour', description='Driving Cost per Hour ($)',
+                          optional=False, type=QgsProcessingParameterNumber.Double, minValue=0, defaultValue=30))
+        self.addParameter(QgsProcessingParameterField(name='SpeedField', description='Road Speed Field (mph, falls back to Average Driving Speed)',
+                          parentLayerParameterName='RoadNetwork', type=QgsProcessingParameterField.Numeric, optional=True, defaultValue=None))
+        self.addParameter(QgsProcessingParameterNumber(name='ThinningFraction', description='Merge Route Points Closer Than (fraction of a tier, 0 = off)',
+                          optional=False, type=QgsProcessingParameterNumber.Double, minValue=0, maxValue=1, defaultValue=0))
         self.addParameter(QgsProcessingParameterNumber(name='CellSize', description='Service Area Cell Size (m)',
                           optional=False, type=QgsProcessingParameterNumber.Integer, defaultValue=50))
+        self.addParameter(QgsProcessingParameterEnum(name='Engine', description='Service Area Engine',
+                          options=self.ENGINE_OPTIONS, optional=False, defaultValue=self.ENGINE_QNEAT3))
+        self.addParameter(QgsProcessingParameterEnum(name='OverlapResolution', description='Isochrone Overlap Resolution (QNEAT3 engine)',
+                          options=self.OVERLAP_OPTIONS, optional=False, defaultValue=self.OVERLAP_NATIVE))
+        self.addParameter(QgsProcessingParameterNumber(name='SimplifyTolerance', description='Simplify Tier Boundaries Tolerance (m, 0 = off)',
+                          optional=False, type=QgsProcessingParameterNumber.Double, minValue=0, defaultValue=0))
+        self.addParameter(QgsProcessingParameterNumber(name='MinPartArea', description='Drop Parts and Holes Smaller Than (m2, 0 = off)',
+                          optional=False, type=QgsProcessingParameterNumber.Double, minValue=0, defaultValue=0))
+        self.addParameter(QgsProcessingParameterBoolean(name='RasterTierSurface', description='Build Tiers From One Raster Tier Surface (QNEAT3 engine; built-in engine always does)',
+                          optional=False, defaultValue=False))
+        self.addParameter(QgsProcessingParameterRasterDestination(name='TierSurface', description='Tier Surface (raster of tier numbers)',
+                          optional=True, createByDefault=False, defaultValue=None))
+        self.addParameter(QgsProcessingParameterFileDestination(name='ProfileReport', description='Stage Profile Report (JSON)',
+                          fileFilter='JSON files (*.json)', optional=True, createByDefault=False, defaultValue=None))
+        self.addParameter(QgsProcessingParameterField(name='RouteIdField', description='Route ID Field (batch of routes, built-in engine)',
+                          parentLayerParameterName='MainRouteSketch', optional=True, defaultValue=None))
+        self.addParameter(QgsProcessingParameterBoolean(name='ProgressiveTiers', description='Write Each Tier As Soon As It Is Done (built-in engine)',
+                          optional=False, defaultValue=False))
+        self.addParameter(QgsProcessingParameterBoolean(name='PreviewOnCanvas', description='Show Finished Tiers On The Map While Running (progressive)',
+                          optional=False, defaultValue=False))
+        self.addParameter(QgsProcessingParameterNumber(name='TileSize', description='Tile Size for Large Areas (mi, 0 = no tiling, built-in engine)',
+                          optional=False, type=QgsProcessingParameterNumber.Double, minValue=0, defaultValue=0))
+        self.addParameter(QgsProcessingParameterBoolean(name='InMemoryPipeline', description='Keep Intermediate Layers In Memory',
+                          optional=False, defaultValue=False))
+        self.addParameter(QgsProcessingParameterBoolean(name='UseGraphCache', description='Reuse Cached Road Graph (built-in engine)',
+                          optional=False, defaultValue=True))
+        self.addParameter(QgsProcessingParameterBoolean(name='ReuseTierCosts', description='Reuse Network Costs When Only Tier Parameters Change (built-in engine)',
+                          optional=False, defaultValue=True))
+        self.addParameter(QgsProcessingParameterBoolean(name='UseResultCache', description='Reuse Cached Result When Inputs and Parameters Are Unchanged',
+                          optional=False, defaultValue=True))
+        self.addParameter(QgsProcessingParameterNumber(name='ResultCacheSizeMB', description='Result Cache Size Limit (MB)',
+                          optional=False, type=QgsProcessingParameterNumber.Double, minValue=0, defaultValue=512))
         # self.addParameter(QgsProcessingParameterFeatureSink(name='ClipBuffer', description='ClipBuffer', optional=True, type=QgsProcessing.TypeVectorPolygon, createByDefault=False, defaultValue=None))
         # self.addParameter(QgsProcessingParameterFeatureSink(name='RoutePoints', description='RoutePoints', optional=True, type=QgsProcessing.TypeVectorPoint, createByDefault=False, defaultValue=None))
         # self.addParameter(QgsProcessingParameterFeatureSink(name='IsochroneRaw', description='IsochroneRaw', optional=True, type=QgsProcessing.TypeVectorPolygon, createByDefault=False, defaultValue=None))
         # self.addParameter(QgsProcessingParameterFeatureSink(name='SAGAIntersectRaw', description='SAGAIntersectRaw', optional=True, type=QgsProcessing.TypeVectorPolygon, createByDefault=False, defaultValue=None))
 
     def processAlgorithm(self, parameters, context, model_feedback):
+        run_key = self.getResultCacheKey(parameters, context, model_feedback)
+        # Stage timings are only comparable between runs of the same inputs with the same caches in play
+        baseline_key = None
+        if run_key is not None:
+            baseline_key = hashlib.sha1(json.dumps([
+                run_key,
+                self.parameterAsBool(parameters, 'UseGraphCache', context),
+                self.parameterAsBool(parameters, 'ReuseTierCosts', context)
+            ]).encode('utf-8')).hexdigest()
+        tracker = FCStageTracker(self.parameterAsBool(parameters, 'InMemoryPipeline', context), baseline_key)
+
+        cache_key = run_key if self.parameterAsBool(parameters, 'UseResultCache', context) else None
+        if cache_key is None:
+            results = self.generateServiceAreas(parameters, context, model_feedback, tracker)
+            return self.finishRun(tracker, parameters, context, model_feedback, results)
+
+        cache_dir = os.path.join(FC_RESULTCACHE_DIR, cache_key)
+        cache_path = os.path.join(cache_dir, 'service_areas.gpkg')
+        if os.path.isfile(cache_path):
+            model_feedback.pushInfo(self.processAlgorithm.__name__ +
+                                    ": Inputs and parameters unchanged, using cached result " + cache_dir)
+            os.utime(cache_dir)
+            with tracker.stage('copyCachedResult') as stage:
+                stage['input'] = cache_path
+                results = {'ServiceAreas': self.copyLayerToServiceAreas(parameters, context, cache_path)}
+            return self.finishRun(tracker, parameters, context, model_feedback, results)
+
+        # Progressive tiers have to reach the real output as they are written, so a miss isn't cached
+        if self.parameterAsBool(parameters, 'ProgressiveTiers', context):
+            results = self.generateServiceAreas(parameters, context, model_feedback, tracker)
+            return self.finishRun(tracker, parameters, context, model_feedback, results)
+
+        # Build into a GeoPackage next to the cache entry and swap it in once complete, then copy it to the
+        # real output, so a failed or canceled run never leaves a partial entry behind
+        cache_dir_tmp = cache_dir + '.tmp'
+        shutil.rmtree(cache_dir_tmp, ignore_errors=True)
+        try:
+            os.makedirs(cache_dir_tmp)
+        except OSError:
+            results = self.generateServiceAreas(parameters, context, model_feedback, tracker)
+            return self.finishRun(tracker, parameters, context, model_feedback, results)
+        try:
+            results = self.generateServiceAreas(
+                dict(parameters, ServiceAreas=os.path.join(cache_dir_tmp, 'service_areas.gpkg')),
+                context, model_feedback, tracker)
+            if model_feedback.isCanceled() or 'ServiceAreas' not in results:
+                results.pop('ServiceAreas', None)
+                return self.finishRun(tracker, parameters, context, model_feedback, results)
+            # Every sink was released when the pipeline returned, so the GeoPackage is complete
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            os.replace(cache_dir_tmp, cache_dir)
+        finally:
+            shutil.rmtree(cache_dir_tmp, ignore_errors=True)
+
+        with tracker.stage('copyResultToOutput') as stage:
+            stage['input'] = cache_path
+            results['ServiceAreas'] = self.copyLayerToServiceAreas(parameters, context, cache_path)
+        self.pruneCacheDir(
+            FC_RESULTCACHE_DIR,
+            max_bytes=self.parameterAsDouble(parameters, 'ResultCacheSizeMB', context) * 1048576
+        )
+        return self.finishRun(tracker, parameters, context, model_feedback, results)
+
+    def generateServiceAreas(self, parameters, context, model_feedback, tracker):
         # Use a multi-step feedback, so that individual child algorithm progress reports are adjusted for the
         # overall progress through the model
         feedback = QgsProcessingMultiStepFeedback(6, model_feedback)
@@ -67,10 +894,7 @@ class FCServiceAreaV30(QgsProcessingAlgorithm):
         fid_saga_selfintersectid = 'ID'
         fid_finalfid = 'fid'
 
-        root = QgsProject().instance().layerTreeRoot()
-        lyrgroup = root.findGroup('Results')
-        if not lyrgroup:
-            lyrgroup = root.insertGroup(0, 'Results')
+        output_intermediate = self.getIntermediateOutput(parameters, context)
 
         tier_count = parameters['NumTiers']
         tierid_max = tier_count - 1
@@ -120,158 +944,194 @@ class FCServiceAreaV30(QgsProcessingAlgorithm):
         feedback.pushInfo(self.processAlgorithm.__name__ +
                           ": tier_specs = " + str(tier_specs))
 
-        feedback.pushInfo(self.processAlgorithm.__name__ +
-                          ": Creating road network clipped by buffer %d miles" % bufferdist_mi)
-
-        # Calculate buffer area around full route sketch
-        vlayer_mainbufferarea = self.generateBufferAroundLayer(
-            parameters,
-            context,
-            feedback,
-            bufferdist_m,
-            parameters['MainRouteSketch']
-        )
-
-        # Create base road network by clipping to main buffer
-        alg_params = {
-            'INPUT': parameters['RoadNetwork'],
-            'OVERLAY': vlayer_mainbufferarea,
-            'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
-            # 'OUTPUT': parameters['RoadNetworkClipped']
-            # 'OUTPUT': parameters['DEBUGRoadsClipped'] if 'DEBUGRoadsClipped' in parameters else QgsProcessing.TEMPORARY_OUTPUT
-        }
-        vlayer_mainroadnetwork = processing.run(
-            'native:clip', alg_params, context=context, feedback=feedback, is_child_algorithm=True
-        )['OUTPUT']
-
-        """
-        Simplify route sketch to speed up processing
-        Process:
-         - Merge lines in road network
-         - Multipart to single part (road network)
-         - Line intersections (road network roads X roads)
-         - Create circular buffer around intersection points, 20m
-         - Extract by location / intersection (buffers X route sketch)
-         - Get centroids of extracted
-        """
-        feedback.pushInfo(self.processAlgorithm.__name__ +
-                          ": Simplifying route to unique points @ road intersections")
-
-        # Merge lines
-        alg_params = {
-            'INPUT': vlayer_mainroadnetwork,
-            'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
-        }
-        vlayer_temp1 = processing.run(
-            'native:mergelines', alg_params, context=context, feedback=feedback, is_child_algorithm=True
-        )['OUTPUT']
-
-        # Multipart to singleparts
-        alg_params = {
-            'INPUT': vlayer_temp1,
-            'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
-        }
-        vlayer_temp1 = processing.run(
-            'native:multiparttosingleparts', alg_params, context=context, feedback=feedback, is_child_algorithm=True
-        )['OUTPUT']
-
-        # Line intersections
-        alg_params = {
-            'INPUT': vlayer_temp1,
-            'INPUT_FIELDS': [''],
-            'INTERSECT': vlayer_temp1,
-            'INTERSECT_FIELDS': [''],
-            'INTERSECT_FIELDS_PREFIX': '',
-            'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
-        }
-        vlayer_temp1 = processing.run(
-            'native:lineintersections', alg_params, context=context, feedback=feedback, is_child_algorithm=True
-        )['OUTPUT']
-
-        # Buffer
-        alg_params = {
-            'DISSOLVE': False,
-            'DISTANCE': 50,
-            'END_CAP_STYLE': 0,
-            'INPUT': vlayer_temp1,
-            'JOIN_STYLE': 0,
-            'MITER_LIMIT': 2,
-            'SEGMENTS': 5,
-            'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
-            # 'OUTPUT': parameters['DEBUGRoadIntersectionBuffers'] if 'DEBUGRoadIntersectionBuffers' in parameters else QgsProcessing.TEMPORARY_OUTPUT
-        }
-        vlayer_temp1 = processing.run(
-            'native:buffer', alg_params, context=context, feedback=feedback, is_child_algorithm=True
-        )['OUTPUT']
-
-        # Extract by location
-        alg_params = {
-            'INPUT': vlayer_temp1,
-            'INTERSECT': parameters['MainRouteSketch'],
-            'PREDICATE': [0],
-            'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
-        }
-        vlayer_temp1 = processing.run(
-            'native:extractbylocation', alg_params, context=context, feedback=feedback, is_child_algorithm=True
-        )['OUTPUT']
+        engine = self.parameterAsEnum(parameters, 'Engine', context)
+        cost_model = self.getCostModel(parameters, context)
+        if cost_model['model'] == self.COST_GENERALIZED:
+            if engine != self.ENGINE_MULTISOURCE:
+                raise QgsProcessingException(
+                    'The generalized cost model requires the built-in multi-source engine')
+            if cost_model['avg_speed'] <= 0:
+                raise QgsProcessingException('The generalized cost model needs a positive Average Driving Speed')
+            if cost_model['per_mile'] + cost_model['per_hour'] <= 0:
+                raise QgsProcessingException(
+                    'The generalized cost model needs a positive Driving Cost per Mile or per Hour')
+            feedback.pushInfo(self.processAlgorithm.__name__ +
+                              ": Generalized cost: $%g/mi + $%g/hr, %s" % (
+                                  cost_model['per_mile'], cost_model['per_hour'],
+                                  'speeds from field ' + cost_model['speed_field'] if cost_model['speed_field']
+                                  else '%g mph everywhere' % cost_model['avg_speed']))
+        if engine != self.ENGINE_MULTISOURCE and self.parameterAsDouble(parameters, 'TileSize', context) > 0:
+            raise QgsProcessingException('Tiled processing (Tile Size) requires the built-in multi-source engine')
+        graph_road = None
+        if engine == self.ENGINE_MULTISOURCE and self.parameterAsBool(parameters, 'UseGraphCache', context):
+            graph_road = self.loadCachedRoadGraph(parameters, context, feedback)
+
+        if graph_road is not None:
+            # Warm graph: route intersections come straight from the cached topology, so the
+            # clip / merge / intersect chain is skipped entirely
+            feedback.pushInfo(self.processAlgorithm.__name__ +
+                              ": Simplifying route to unique points @ cached road graph intersections")
+            crs_roads = self.parameterAsVectorLayer(parameters, 'RoadNetwork', context).crs()
+            intersections_xy = graph_road.node_xy[graph_road.junctionNodes()]
+        else:
+            feedback.pushInfo(self.processAlgorithm.__name__ +
+                              ": Creating road network clipped by buffer %d miles" % bufferdist_mi)
+
+            # Calculate buffer area around full route sketch
+            vlayer_mainbufferarea = self.generateBufferAroundLayer(
+                parameters,
+                context,
+                feedback,
+                tracker,
+                bufferdist_m,
+                parameters['MainRouteSketch']
+            )
+
+            # Create base road network by clipping to main buffer
+            with tracker.stage('clipRoadNetwork') as stage:
+                stage['input'] = parameters['RoadNetwork']
+                stage['output'] = vlayer_mainroadnetwork = self.clipRoadNetworkToBuffer(
+                    parameters,
+                    context,
+                    feedback,
+                    vlayer_mainbufferarea
+                )
 
-        # Centroids
-        alg_params = {
-            'ALL_PARTS': False,
-            'INPUT': vlayer_temp1,
-            'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
-            # 'OUTPUT': parameters['DEBUGSimplifiedRouteSketch'] if 'DEBUGSimplifiedRouteSketch' in parameters else QgsProcessing.TEMPORARY_OUTPUT
-        }
-        vlayer_temp1 = processing.run(
-            'native:centroids', alg_params, context=context, feedback=feedback, is_child_algorithm=True
-        )['OUTPUT']
+            if engine == self.ENGINE_MULTISOURCE:
+                # Same junctions as a cached graph gives, so the cache doesn't change the route points
+                feedback.pushInfo(self.processAlgorithm.__name__ +
+                                  ": Simplifying route to unique points @ road graph intersections")
+                with tracker.stage('buildRoadGraph') as stage:
+                    stage['input'] = vlayer_mainroadnetwork
+                    graph_road = FCRoadGraph.fromLineLayer(
+                        context.getMapLayer(vlayer_mainroadnetwork), feedback,
+                        speed_field=self.parameterAsString(parameters, 'SpeedField', context) or None)
+                    stage['output_features'] = graph_road.edgeCount()
+                crs_roads = context.getMapLayer(vlayer_mainroadnetwork).crs()
+                intersections_xy = graph_road.node_xy[graph_road.junctionNodes()]
+            else:
+                """
+                Simplify route sketch to speed up processing
+                Process:
+                 - Merge lines in road network
+                 - Multipart to single part (road network)
+                 - Line intersections (road network roads X roads)
+                 - Snap: keep unique intersection points within 50m of the route sketch
+                """
+                feedback.pushInfo(self.processAlgorithm.__name__ +
+                                  ": Simplifying route to unique points @ road intersections")
+
+                # Merge lines
+                alg_params = {
+                    'INPUT': vlayer_mainroadnetwork,
+                    'OUTPUT': output_intermediate
+                }
+                vlayer_temp1 = self.runChildAlgorithm(
+                    tracker, 'native:mergelines', alg_params, context, feedback
+                )['OUTPUT']
+
+                # Multipart to singleparts
+                alg_params = {
+                    'INPUT': vlayer_temp1,
+                    'OUTPUT': output_intermediate
+                }
+                vlayer_temp1 = self.runChildAlgorithm(
+                    tracker, 'native:multiparttosingleparts', alg_params, context, feedback
+                )['OUTPUT']
+
+                # Line intersections
+                alg_params = {
+                    'INPUT': vlayer_temp1,
+                    'INPUT_FIELDS': [''],
+                    'INTERSECT': vlayer_temp1,
+                    'INTERSECT_FIELDS': [''],
+                    'INTERSECT_FIELDS_PREFIX': '',
+                    'OUTPUT': output_intermediate
+                }
+                vlayer_temp1 = self.runChildAlgorithm(
+                    tracker, 'native:lineintersections', alg_params, context, feedback
+                )['OUTPUT']
+
+                layer_intersections = context.getMapLayer(vlayer_temp1)
+                crs_roads = layer_intersections.crs()
+                intersections_xy = self.getLayerPointsXY(layer_intersections)
+
+        # Batch mode: one set of route points per distinct route id, all sharing the network built above
+        fid_routeid = self.parameterAsString(parameters, 'RouteIdField', context)
+        routes_request = {None: QgsFeatureRequest()}
+        if fid_routeid:
+            if engine != self.ENGINE_MULTISOURCE:
+                raise QgsProcessingException(
+                    'Batch routes (Route ID Field) require the built-in multi-source engine')
+            source_sketch = self.parameterAsSource(parameters, 'MainRouteSketch', context)
+            route_ids = sorted(
+                [v for v in source_sketch.uniqueValues(source_sketch.fields().lookupField(fid_routeid))
+                 if v is not None and v != NULL],
+                key=str)
+            if not route_ids:
+                raise QgsProcessingException(
+                    'Route ID Field %s has no values, there are no routes to process' % fid_routeid)
+            routes_request = dict(
+                (route_id, QgsFeatureRequest().setFilterExpression(
+                    QgsExpression.createFieldEqualityExpression(fid_routeid, route_id)))
+                for route_id in route_ids
+            )
+            feedback.pushInfo(self.processAlgorithm.__name__ +
+                              ": Batch of %d routes by field %s" % (len(route_ids), fid_routeid))
+
+        with tracker.stage('getIntersectionGrid') as stage:
+            intersections = self.getIntersectionGrid(intersections_xy)
+            stage['output_features'] = len(intersections[0])
+
+        routes_points = {}
+        for route_id, request in routes_request.items():
+            with tracker.stage('snapSketchToIntersections') as stage:
+                stage['output'] = routes_points[route_id] = self.snapSketchToIntersections(
+                    parameters,
+                    context,
+                    feedback,
+                    intersections,
+                    crs_roads,
+                    fid_sketchpointsuniqueid,
+                    request
+                )
 
-        # Dissolve + simplify centroid points to minimize point count
-        alg_params = {
-            'FIELD': [],
-            'INPUT': vlayer_temp1,
-            'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
-            # 'OUTPUT': parameters['RouteSketchSimplified']
-        }
-        vlayer_temp1 = processing.run(
-            'native:dissolve', alg_params, context=context, feedback=feedback, is_child_algorithm=True
-        )['OUTPUT']
+        thinning_fraction = self.parameterAsDouble(parameters, 'ThinningFraction', context)
+        if thinning_fraction > 0:
+            for route_id in routes_points:
+                with tracker.stage('thinRoutePoints') as stage:
+                    stage['input'] = routes_points[route_id]
+                    stage['output'] = routes_points[route_id] = self.thinRoutePoints(
+                        context,
+                        feedback,
+                        routes_points[route_id],
+                        thinning_fraction * distcost_pertier_m,
+                        distcost_pertier_m,
+                        fid_sketchpointsuniqueid
+                    )
+        vlayer_mainroutesketch = routes_points[None] if None in routes_points else None
 
-        # Convert to single point layer
-        alg_params = {
-            'INPUT': vlayer_temp1,
-            'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
-            # 'OUTPUT': parameters['RouteSketchSimplified']
+        #results['RouteSketchSimplified'] = vlayer_mainroutesketch
 
-        }
-        vlayer_temp1 = processing.run(
-            'native:multiparttosingleparts', alg_params, context=context, feedback=feedback, is_child_algorithm=True
-        )['OUTPUT']
+        if engine == self.ENGINE_MULTISOURCE:
+            results = self.generateServiceAreasMultiSource(
+                parameters,
+                context,
+                feedback,
+                tracker,
+                vlayer_mainroadnetwork,
+                graph_road,
+                routes_points,
+                tier_specs,
+                output_tablefields,
+                cost_model,
+                self.getTierCostStep(cost_model, distcost_pertier_mi)
+            )
+            return results
 
         feedback.pushInfo(self.processAlgorithm.__name__ +
                           ": Starting isochrone calculations (QNEAT3)")
 
-        # Add autoincremental field
-        alg_params = {
-            'FIELD_NAME': fid_sketchpointsuniqueid,
-            'GROUP_FIELDS': [''],
-            'INPUT': vlayer_temp1,
-            'SORT_ASCENDING': True,
-            'SORT_EXPRESSION': '',
-            'SORT_NULLS_FIRST': False,
-            'START': 0,
-            # 'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
-            'OUTPUT': parameters['RoutePoints'] if 'RoutePoints' in parameters else QgsProcessing.TEMPORARY_OUTPUT
-        }
-        vlayer_mainroutesketch = processing.run(
-            'native:addautoincrementalfield', alg_params, context=context, feedback=feedback, is_child_algorithm=True
-        )['OUTPUT']
-
-        #results['RouteSketchSimplified'] = vlayer_mainroutesketch
-
-        feedback.pushInfo(self.processAlgorithm.__name__ + ": Route points feature count = " +
-                          str(self.getLayerFeatureCount(context, vlayer_mainroutesketch)))
-
         """
         # Delete duplicate geometries
         alg_params = {
@@ -284,6 +1144,22 @@ class FCServiceAreaV30(QgsProcessingAlgorithm):
         feedback.pushInfo(self.processAlgorithm.__name__ + ": Route points feature count DUPS REMOVED = " + str(self.getLayerFeatureCount(context, vlayer_temp1)))
         """
 
+        if self.parameterAsBool(parameters, 'RasterTierSurface', context):
+            results = self.generateServiceAreasQneatRaster(
+                parameters,
+                context,
+                feedback,
+                tracker,
+                vlayer_mainroadnetwork,
+                vlayer_mainroutesketch,
+                fid_sketchpointsuniqueid,
+                crs_roads,
+                tier_specs,
+                output_tablefields,
+                distcost_pertier_m
+            )
+            return results
+
         # Iso-Area as Polygons (from Layer)
         alg_params = {
             'CELL_SIZE': parameters['CellSize'],
@@ -304,13 +1180,38 @@ class FCServiceAreaV30(QgsProcessingAlgorithm):
             'VALUE_FORWARD': '',
             'OUTPUT_INTERPOLATION': QgsProcessing.TEMPORARY_OUTPUT,
             # 'OUTPUT_POLYGONS': QgsProcessing.TEMPORARY_OUTPUT
-            'OUTPUT_POLYGONS': parameters['IsochroneRaw'] if 'IsochroneRaw' in parameters else QgsProcessing.TEMPORARY_OUTPUT
+            'OUTPUT_POLYGONS': parameters['IsochroneRaw'] if 'IsochroneRaw' in parameters else output_intermediate
         }
 
-        vlayer_isochrone = processing.run(
-            'qneat3:isoareaaspolygonsfromlayer', alg_params, context=context, feedback=feedback, is_child_algorithm=True
+        vlayer_isochrone = self.runChildAlgorithm(
+            tracker, 'qneat3:isoareaaspolygonsfromlayer', alg_params, context, feedback, output_key='OUTPUT_POLYGONS'
         )['OUTPUT_POLYGONS']
 
+        if self.parameterAsEnum(parameters, 'OverlapResolution', context) == self.OVERLAP_NATIVE:
+            feedback.pushInfo(self.processAlgorithm.__name__ +
+                              ": Starting minimum-tier union")
+            layer_isochrone = context.getMapLayer(vlayer_isochrone)
+            with tracker.stage('minimumTierUnion') as stage:
+                stage['input'] = vlayer_isochrone
+                tier_geoms = self.unionMinimumTiers(
+                    feedback,
+                    layer_isochrone,
+                    fid_qneatisochrone_costlevelid
+                )
+                stage['output_features'] = len(tier_geoms)
+            if feedback.isCanceled():
+                return results
+            tier_geoms = self.generalizeTierGeometries(parameters, context, feedback, tracker, tier_geoms)
+
+            with tracker.stage('writeServiceAreas'):
+                sink, dest_id, fields = self.createServiceAreaSink(
+                    parameters, context, output_tablefields, layer_isochrone.crs())
+                for tier_idx in sorted(tier_geoms):
+                    self.addTierFeature(sink, fields, tier_idx, tier_geoms[tier_idx], tier_specs, output_tablefields)
+
+            results['ServiceAreas'] = dest_id
+            return results
+
         # DO: Run SAGA Polygon Self-Intersection on result
         # Polygon self-intersection
         feedback.pushInfo(self.processAlgorithm.__name__ +
@@ -322,8 +1223,8 @@ class FCServiceAreaV30(QgsProcessingAlgorithm):
             'INTERSECT': parameters['SAGAIntersectRaw'] if 'SAGAIntersectRawG' in parameters else QgsProcessing.TEMPORARY_OUTPUT
             # 'INTERSECT': QgsProcessing.TEMPORARY_OUTPUT
         }
-        intersect_results = processing.run(
-            'saga:polygonselfintersection', alg_params, context=context, feedback=feedback, is_child_algorithm=True
+        intersect_results = self.runChildAlgorithm(
+            tracker, 'saga:polygonselfintersection', alg_params, context, feedback, output_key='INTERSECT'
         )
         vlayer_temp1 = intersect_results['INTERSECT']
 
@@ -339,12 +1240,12 @@ class FCServiceAreaV30(QgsProcessingAlgorithm):
             'SORT_EXPRESSION': '',
             'SORT_NULLS_FIRST': False,
             'START': 0,
-            'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
+            'OUTPUT': output_intermediate
             # 'OUTPUT': parameters['ServiceAreas']
         }
 
-        vlayer_temp1 = processing.run(
-            'native:addautoincrementalfield', alg_params, context=context, feedback=feedback, is_child_algorithm=True
+        vlayer_temp1 = self.runChildAlgorithm(
+            tracker, 'native:addautoincrementalfield', alg_params, context, feedback
         )['OUTPUT']
 
         # DO: Clean up result
@@ -356,61 +1257,1567 @@ class FCServiceAreaV30(QgsProcessingAlgorithm):
                           ": Starting self-intersection cleanup")
 
         #layer = QgsVectorLayer(vlayer_temp1, 'isochrone_intersected_incremented', 'ogr')
-        layer = context.getMapLayer(vlayer_temp1)
-        prov = layer.dataProvider()
+        with tracker.stage('selfIntersectionCleanup') as stage:
+            stage['output'] = vlayer_temp1
+            self.writeMinimumTierAttributes(
+                context.getMapLayer(vlayer_temp1),
+                fid_saga_selfintersectid,
+                delimiter_tierminparam,
+                tier_specs,
+                output_tablefields
+            )
+
+        # Dissolve final service area polygon
+        generalize = self.isGeneralizationRequested(parameters, context)
+        alg_params = {
+            'FIELD': [output_tablefields['tier_num']['fname']],
+            'INPUT': vlayer_temp1,
+            # 'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
+            'OUTPUT': output_intermediate if generalize else parameters['ServiceAreas']
+        }
+
+        vlayer_final = self.runChildAlgorithm(
+            tracker, 'native:dissolve', alg_params, context, feedback
+        )['OUTPUT']
+        if generalize:
+            vlayer_final = self.writeGeneralizedTiers(
+                parameters, context, feedback, tracker, vlayer_final, tier_specs, output_tablefields)
+
+        results['ServiceAreas'] = vlayer_final
+        return results
+
+    def generateServiceAreasQneatRaster(
+        self,
+        parameters,
+        context,
+        model_feedback,
+        tracker,
+        vlayer_roads,
+        vlayer_routepoints,
+        fid_uniqueid,
+        crs,
+        tier_specs,
+        output_tablefields,
+        tiercost_step
+    ):
+        """
+        QNEAT3 raster mode: take QNEAT3's single merged (minimum) cost raster for all route points, bin it into
+        tiers cell by cell and polygonize once. The per-point polygons, SAGA self-intersection and min-tier
+        cleanup are skipped, which matters most at small CellSize where the polygon count explodes.
+        """
+        results = {}
+        tier_count = len(tier_specs)
+
+        # Iso-Area as Interpolation (from Layer)
+        alg_params = {
+            'CELL_SIZE': parameters['CellSize'],
+            'DEFAULT_DIRECTION': 2,
+            'DEFAULT_SPEED': parameters['CostAvgSpeed'],
+            'DIRECTION_FIELD': '',
+            'ENTRY_COST_CALCULATION_METHOD': 0,
+            'ID_FIELD': fid_uniqueid,
+            'INPUT': vlayer_roads,
+            'MAX_DIST': tiercost_step * (tier_count + 1),
+            'SPEED_FIELD': '',
+            'START_POINTS': vlayer_routepoints,
+            'STRATEGY': 0,
+            'TOLERANCE': 0,
+            'VALUE_BACKWARD': '',
+            'VALUE_BOTH': '',
+            'VALUE_FORWARD': '',
+            'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
+        }
+        raster_cost = self.runChildAlgorithm(
+            tracker, 'qneat3:isoareaasinterpolationfromlayer', alg_params, context, model_feedback
+        )['OUTPUT']
+
+        raster_output = self.getTierSurfaceOutput(parameters, context)
+        tier_geoms = self.generateTierGeometriesFromCostRaster(
+            parameters,
+            context,
+            tracker,
+            raster_cost,
+            crs,
+            tier_count,
+            tiercost_step,
+            raster_output
+        )
+        if raster_output:
+            results['TierSurface'] = raster_output
+        tier_geoms = self.generalizeTierGeometries(parameters, context, model_feedback, tracker, tier_geoms)
+
+        with tracker.stage('writeServiceAreas'):
+            sink, dest_id, fields = self.createServiceAreaSink(parameters, context, output_tablefields, crs)
+            for tier_idx in sorted(tier_geoms):
+                self.addTierFeature(sink, fields, tier_idx, tier_geoms[tier_idx], tier_specs, output_tablefields)
+
+        results['ServiceAreas'] = dest_id
+        return results
+
+    def unionMinimumTiers(
+        self,
+        model_feedback,
+        layer_isochrone,
+        fid_costlevelid
+    ):
+        """
+        Resolves overlapping per-point isochrone polygons to their minimum tier: one geometry per 0-based tier
+        index (the fid_costlevelid value), tier k being the union of tiers 0..k minus the union of tiers 0..k-1.
+
+        Same nested rings as self-intersection + minimum tier + dissolve, but with one cascaded union
+        (GEOS unary union, STRtree-ordered) and one difference per tier instead of one operation per fragment.
+        """
+        idx_costlevelid = layer_isochrone.fields().lookupField(fid_costlevelid)
+        request = QgsFeatureRequest().setSubsetOfAttributes([idx_costlevelid])
+        parts = {}
+        for f in layer_isochrone.getFeatures(request):
+            v = f[idx_costlevelid]
+            if not f.hasGeometry() or v is None or v == NULL:
+                continue
+            parts.setdefault(int(v), []).append(f.geometry())
+
+        tier_geoms = {}
+        geom_lower = None
+        for step, tier_idx in enumerate(sorted(parts)):
+            if model_feedback.isCanceled():
+                break
+            geom_upto = QgsGeometry.unaryUnion(parts.pop(tier_idx) + ([geom_lower] if geom_lower is not None else []))
+            tier_geoms[tier_idx] = geom_upto if geom_lower is None else geom_upto.difference(geom_lower)
+            geom_lower = geom_upto
+            model_feedback.setProgress(100.0 * (step + 1) / (step + 1 + len(parts)))
+        return tier_geoms
+
+    def isGeneralizationRequested(
+        self, parameters, context
+    ):
+        return (self.parameterAsDouble(parameters, 'SimplifyTolerance', context) > 0 or
+                self.parameterAsDouble(parameters, 'MinPartArea', context) > 0)
+
+    def generalizeTierGeometries(
+        self, parameters, context, model_feedback, tracker, tier_geoms
+    ):
+        """
+        Simplifies the tier geometries (0-based tier index -> rings) with SimplifyTolerance and drops parts and
+        holes smaller than MinPartArea, without opening gaps or overlaps between tiers. Returns tier_geoms
+        unchanged when neither is set.
+
+        Tiers are generalized as their nested cumulative areas U_k = tiers 0..k: S_k = simplify(U_k) + S_k-1,
+        cleaned of small parts and holes, and tier k becomes S_k - S_k-1. Every tier boundary is then the one
+        shared, already simplified S_k-1 boundary of its neighbours. Simplification is GEOS'
+        topology-preserving simplify, so no area splits or self-intersects.
+        """
+        if not self.isGeneralizationRequested(parameters, context):
+            return tier_geoms
+        tolerance = self.parameterAsDouble(parameters, 'SimplifyTolerance', context)
+        min_area = self.parameterAsDouble(parameters, 'MinPartArea', context)
+
+        with tracker.stage('generalizeTierGeometries') as stage:
+            generalized = {}
+            geom_upto = None
+            geom_lower = None
+            for tier_idx in sorted(tier_geoms):
+                geom_upto = tier_geoms[tier_idx] if geom_upto is None else geom_upto.combine(tier_geoms[tier_idx])
+                geom_simple = self.generalizeCumulativeTier(geom_upto, geom_lower, tolerance, min_area)
+                generalized[tier_idx] = self.differenceFromLowerTiers(geom_simple, geom_lower)
+                geom_lower = geom_simple
+            stage['output_features'] = len(generalized)
+
+        vertices_before = sum(g.constGet().nCoordinates() for g in tier_geoms.values() if not g.isNull())
+        vertices_after = sum(g.constGet().nCoordinates() for g in generalized.values() if not g.isNull())
+        bytes_before = sum(len(g.asWkb()) for g in tier_geoms.values())
+        bytes_after = sum(len(g.asWkb()) for g in generalized.values())
+        model_feedback.pushInfo(self.generalizeTierGeometries.__name__ +
+                                ": Vertices %d -> %d, WKB bytes %d -> %d (tolerance %g m, min area %g m2)" % (
+                                    vertices_before, vertices_after, bytes_before, bytes_after, tolerance, min_area))
+        return generalized
+
+    def generalizeCumulativeTier(
+        self, geom_upto, geom_lower, tolerance, min_area
+    ):
+        """
+        S_k of generalizeTierGeometries: geom_upto (U_k) simplified with tolerance, joined with geom_lower
+        (S_k-1, or None for the first tier) and cleaned of parts and holes under min_area (0 = skip).
+        """
+        geom_simple = geom_upto.simplify(tolerance) if tolerance > 0 else QgsGeometry(geom_upto)
+        if geom_lower is not None and not geom_lower.isEmpty():
+            geom_simple = geom_simple.combine(geom_lower)
+        if min_area > 0:
+            geom_simple = self.removeSmallParts(geom_simple, min_area)
+        return geom_simple
+
+    def differenceFromLowerTiers(
+        self, geom_upto, geom_lower
+    ):
+        if geom_lower is None or geom_lower.isEmpty():
+            return geom_upto
+        return geom_upto.difference(geom_lower)
+
+    def removeSmallParts(
+        self, geom, min_area
+    ):
+        """
+        geom without polygon parts or holes smaller than min_area.
+        """
+        geom = geom.removeInteriorRings(min_area)
+        parts = [part for part in geom.asGeometryCollection() if part.area() >= min_area]
+        return QgsGeometry.collectGeometry(parts) if parts else QgsGeometry()
+
+    def writeGeneralizedTiers(
+        self,
+        parameters,
+        context,
+        model_feedback,
+        tracker,
+        vlayer_dissolved,
+        tier_specs,
+        output_tablefields,
+        field_route=None
+    ):
+        """
+        Reads a layer dissolved by TIERNUM (and route), generalizes each route's tiers and writes them to the
+        ServiceAreas sink. Returns the sink's destination id.
+        """
+        layer = context.getMapLayer(vlayer_dissolved)
+        idx_tiernum = layer.fields().lookupField(output_tablefields['tier_num']['fname'])
+        idx_route = layer.fields().lookupField(field_route.name()) if field_route is not None else -1
+        routes_tier_geoms = {}
+        for f in layer.getFeatures():
+            if not f.hasGeometry() or f[idx_tiernum] is None or f[idx_tiernum] == NULL:
+                continue
+            route_tiers = routes_tier_geoms.setdefault(f[idx_route] if idx_route >= 0 else None, {})
+            route_tiers[int(f[idx_tiernum]) - 1] = f.geometry()
+
+        sink, dest_id, fields = self.createServiceAreaSink(
+            parameters, context, output_tablefields, layer.crs(), field_route)
+        for route_id, tier_geoms in routes_tier_geoms.items():
+            tier_geoms = self.generalizeTierGeometries(parameters, context, model_feedback, tracker, tier_geoms)
+            with tracker.stage('writeServiceAreas'):
+                for tier_idx in sorted(tier_geoms):
+                    self.addTierFeature(sink, fields, tier_idx, tier_geoms[tier_idx], tier_specs, output_tablefields,
+                                        [route_id] if field_route is not None else [])
+        return dest_id
+
+    def writeMinimumTierAttributes(
+        self,
+        layer,
+        fid_intersectid,
+        delimiter,
+        tier_specs,
+        output_tablefields
+    ):
+        """
+        Replaces all fields of the self-intersection layer with the tier fields of the lowest tier listed in
+        each feature's fid_intersectid value ('2|0|1' -> tier 0).
 
+        The id column is read once without geometry, the per-row minimum comes from a single reduceat over
+        all parsed ids (parseMinimumTierIds), the field add and delete go to the provider back to back with one fields refresh,
+        and every value is written with one changeAttributeValues call.
+        """
+        prov = layer.dataProvider()
         lyr_fieldnames_orig = list(prov.fieldNameMap())
-        newfields_objs = [val['qfieldobj']
-                          for val in output_tablefields.values()]
-        newfields_keys = list(output_tablefields)
+        idx_intersectid = prov.fieldNameMap()[fid_intersectid]
+
+        request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes([idx_intersectid])
+        fids = []
+        intersect_ids = []
+        for f in layer.getFeatures(request):
+            fids.append(f.id())
+            v = f[idx_intersectid]
+            intersect_ids.append(v if isinstance(v, str) else '')
+
+        tier_min = self.parseMinimumTierIds(intersect_ids, delimiter)
+
+        prov.addAttributes([v['qfieldobj'] for v in output_tablefields.values()])
+        prov.deleteAttributes([prov.fieldNameMap()[n] for n in lyr_fieldnames_orig])
+        layer.updateFields()
+
+        lyr_fieldnamemap_final = prov.fieldNameMap()
+        tier_attrs = dict(
+            (tier_idx, dict((lyr_fieldnamemap_final[v['fname']], spec[k]) for k, v in output_tablefields.items()))
+            for tier_idx, spec in tier_specs.items()
+        )
+        prov.changeAttributeValues(dict(
+            (fid, tier_attrs[tier_idx]) for fid, tier_idx in zip(fids, tier_min.tolist()) if tier_idx in tier_attrs
+        ))
+        layer.updateFields()
+
+    def parseMinimumTierIds(
+        self, intersect_ids, delimiter
+    ):
+        """
+        Lowest tier of each delimiter-joined tier id string ('2|0|1' -> 0), -1 for empty ones.
+        """
+        id_counts = np.array([v.count(delimiter) + 1 if v else 0 for v in intersect_ids], dtype=np.int64)
+        has_ids = id_counts > 0
+        tier_min = np.full(len(intersect_ids), -1, dtype=np.int64)
+        if has_ids.any():
+            ids_all = np.array(delimiter.join(v for v in intersect_ids if v).split(delimiter)).astype(np.int64)
+            id_offsets = np.concatenate(([0], np.cumsum(id_counts[has_ids])[:-1]))
+            tier_min[has_ids] = np.minimum.reduceat(ids_all, id_offsets)
+        return tier_min
+
+    def generateServiceAreasMultiSource(
+        self,
+        parameters,
+        context,
+        model_feedback,
+        tracker,
+        vlayer_roads,
+        graph_road,
+        routes_points,
+        tier_specs,
+        output_tablefields,
+        cost_model,
+        tiercost_step
+    ):
+        """
+        Built-in engine: build the road graph once, run a single multi-source search from all route points,
+        interpolate the node costs into one cost surface and bin it into tiers by the per-tier cost thresholds.
+        Each cell gets exactly one tier, so there are no overlapping per-point polygons to resolve.
+        Costs are meters or, for the generalized cost model, dollars (tiercost_step is in the same unit).
+
+        routes_points maps route id -> route point layer id; a single unbatched run uses the key None.
+        Batches share one graph, fan their searches out over a process pool and write to one sink tagged
+        with the route id.
+        """
+        results = {}
+        tier_count = len(tier_specs)
+        tiercost_max = tiercost_step * tier_count
+        # Search one tier past the last threshold so the interpolation has a boundary to fall off to
+        tiercost_cutoff = tiercost_max + tiercost_step
+        is_batch = None not in routes_points
+        if not routes_points:
+            raise QgsProcessingException('No routes to process')
+
+        crs = context.getMapLayer(next(iter(routes_points.values()))).crs()
+
+        graph = graph_road
+        if graph is None:
+            model_feedback.pushInfo(self.generateServiceAreasMultiSource.__name__ +
+                                    ": Building road graph")
+            with tracker.stage('buildRoadGraph') as stage:
+                stage['input'] = vlayer_roads
+                graph = FCRoadGraph.fromLineLayer(
+                    context.getMapLayer(vlayer_roads), model_feedback,
+                    speed_field=self.parameterAsString(parameters, 'SpeedField', context) or None)
+                stage['output_features'] = graph.edgeCount()
+        model_feedback.pushInfo(self.generateServiceAreasMultiSource.__name__ +
+                                ": Road graph nodes = %d, edges = %d" % (graph.nodeCount(), graph.edgeCount()))
+
+        edge_cost = None
+        if cost_model['model'] == self.COST_GENERALIZED:
+            with tracker.stage('generalizedEdgeCost'):
+                edge_cost = graph.generalizedEdgeCost(
+                    cost_model['per_mile'], cost_model['per_hour'], cost_model['avg_speed'])
+
+        routes_sources = {}
+        for route_id, vlayer_routepoints in routes_points.items():
+            routepoints_xy = [
+                (f.geometry().asPoint().x(), f.geometry().asPoint().y())
+                for f in context.getMapLayer(vlayer_routepoints).getFeatures(QgsFeatureRequest().setNoAttributes())
+                if f.hasGeometry()
+            ]
+            source_nodes = graph.nearestNodes(routepoints_xy, self.ROUTEPOINT_SNAP_M)
+            source_nodes = np.unique(source_nodes[source_nodes >= 0])
+            if len(source_nodes) == 0:
+                if not is_batch:
+                    raise QgsProcessingException('No route points could be snapped to the road network')
+                model_feedback.reportError('Route %s: no route points could be snapped to the road network, '
+                                           'skipped' % route_id)
+                continue
+            routes_sources[route_id] = source_nodes
+        if not routes_sources:
+            raise QgsProcessingException('No route of the batch could be snapped to the road network')
+
+        tile_size = self.convertMilesToMeters(self.parameterAsDouble(parameters, 'TileSize', context))
+        if tile_size > 0:
+            results.update(self.generateServiceAreasTiled(
+                parameters,
+                context,
+                model_feedback,
+                tracker,
+                graph,
+                edge_cost,
+                routes_sources,
+                crs,
+                tier_specs,
+                output_tablefields,
+                tiercost_step,
+                tile_size
+            ))
+            return results
+
+        if self.parameterAsBool(parameters, 'ProgressiveTiers', context):
+            results.update(self.generateServiceAreasProgressive(
+                parameters,
+                context,
+                model_feedback,
+                tracker,
+                graph,
+                edge_cost,
+                routes_sources,
+                crs,
+                tier_specs,
+                output_tablefields,
+                tiercost_step
+            ))
+            return results
+
+        # Node costs only depend on the network and the route nodes, so a previous run's search can be
+        # re-binned for new tier parameters as long as it reached at least as far as the new cutoff
+        reuse_costs = self.parameterAsBool(parameters, 'ReuseTierCosts', context)
+        routes_cachekey = {}
+        routes_reached = {}
+        if reuse_costs:
+            for route_id, source_nodes in routes_sources.items():
+                routes_cachekey[route_id] = self.getCostCacheKey(graph, source_nodes, cost_model)
+                cached = self.loadCachedNodeCosts(routes_cachekey[route_id], tiercost_cutoff)
+                if cached is not None:
+                    routes_reached[route_id] = cached
+            if routes_reached:
+                model_feedback.pushInfo(self.generateServiceAreasMultiSource.__name__ +
+                                        ": Reusing cached network costs for %d of %d routes" % (
+                                            len(routes_reached), len(routes_sources)))
+
+        routes_search = dict(
+            (route_id, source_nodes) for route_id, source_nodes in routes_sources.items()
+            if route_id not in routes_reached
+        )
+        if routes_search:
+            model_feedback.pushInfo(self.generateServiceAreasMultiSource.__name__ +
+                                    ": Multi-source search from %d route nodes" % sum(
+                                        len(v) for v in routes_search.values()))
+            # A cached graph is the whole network, not just the route buffer: each search is clipped to the
+            # nodes its route can reach, so it costs the route's footprint rather than the network's size
+            reach = self.getCostReachMeters(graph, edge_cost, tiercost_cutoff)
+            with tracker.stage('multiSourceDijkstra'):
+                if len(routes_search) > 1:
+                    routes_searched = self.searchRoutesInParallel(
+                        graph, routes_search, tiercost_cutoff, reach, model_feedback, edge_cost)
+                else:
+                    route_id, source_nodes = next(iter(routes_search.items()))
+                    node_cost = graph.multiSourceDijkstra(
+                        source_nodes, tiercost_cutoff, edge_cost, feedback=model_feedback, reach=reach)
+                    reached = np.flatnonzero(np.isfinite(node_cost))
+                    routes_searched = {route_id: (reached, node_cost[reached])}
+            if model_feedback.isCanceled():
+                return results
+            if reuse_costs:
+                for route_id, (reached, reached_cost) in routes_searched.items():
+                    self.saveCachedNodeCosts(routes_cachekey[route_id], reached, reached_cost, tiercost_cutoff)
+            routes_reached.update(routes_searched)
+
+        sink, dest_id, fields = self.createServiceAreaSink(
+            parameters,
+            context,
+            output_tablefields,
+            crs,
+            self.getRouteIdField(parameters, context) if is_batch else None
+        )
 
-        with edit(layer):
-            added = prov.addAttributes(newfields_objs)
-            layer.updateFields()
+        # A batch has no single surface to write, so the tier raster is only kept for unbatched runs
+        raster_output = self.getTierSurfaceOutput(parameters, context) if not is_batch else None
+        if raster_output:
+            results['TierSurface'] = raster_output
+
+        route_ids = [route_id for route_id in routes_sources if route_id in routes_reached]
+        route_feedback = QgsProcessingMultiStepFeedback(len(route_ids), model_feedback)
+        for route_step, route_id in enumerate(route_ids):
+            route_feedback.setCurrentStep(route_step)
+            if route_feedback.isCanceled():
+                break
+            if is_batch:
+                route_feedback.pushInfo(self.generateServiceAreasMultiSource.__name__ +
+                                        ": Route %s (%d of %d)" % (route_id, route_step + 1, len(route_ids)))
+
+            reached, reached_cost = routes_reached.pop(route_id)
+            node_cost = np.full(graph.nodeCount(), np.inf)
+            node_cost[reached] = reached_cost
+
+            # Same costs binned the same way give the same polygons: a TierMinimums-only change is
+            # just an attribute rewrite
+            tiers_cachekey = '%r|%d|%r' % (tiercost_step, tier_count, parameters['CellSize'])
+            tier_geoms = None
+            if reuse_costs and not raster_output:
+                tier_geoms = self.loadCachedTierGeometries(routes_cachekey[route_id], tiers_cachekey)
+                if tier_geoms is not None:
+                    route_feedback.pushInfo(self.generateServiceAreasMultiSource.__name__ +
+                                            ": Tier geometries unchanged, rewriting attributes only")
+            if tier_geoms is None:
+                tier_geoms = self.generateTierGeometriesFromNodeCost(
+                    parameters,
+                    context,
+                    route_feedback,
+                    tracker,
+                    graph,
+                    node_cost,
+                    crs,
+                    tier_count,
+                    tiercost_step,
+                    raster_output
+                )
+                if reuse_costs and not route_feedback.isCanceled():
+                    self.saveCachedTierGeometries(routes_cachekey[route_id], tiers_cachekey, tier_geoms)
+            tier_geoms = self.generalizeTierGeometries(parameters, context, route_feedback, tracker, tier_geoms)
 
-        with edit(layer):
-            # Populate new fields in each feature
-            for f in layer.getFeatures():
-                tier_idx = None
-                intersect_idfieldval = f[fid_saga_selfintersectid]
+            with tracker.stage('writeServiceAreas'):
+                for tier_idx in sorted(tier_geoms):
+                    self.addTierFeature(sink, fields, tier_idx, tier_geoms[tier_idx], tier_specs, output_tablefields,
+                                        [route_id] if is_batch else [])
+
+        results['ServiceAreas'] = dest_id
+        return results
 
-                if intersect_idfieldval:
-                    intersect_tiers = [
-                        int(s) for s in intersect_idfieldval.split(delimiter_tierminparam)]
-                    tier_idx = min(intersect_tiers)
+    def generateServiceAreasProgressive(
+        self,
+        parameters,
+        context,
+        model_feedback,
+        tracker,
+        graph,
+        edge_cost,
+        routes_sources,
+        crs,
+        tier_specs,
+        output_tablefields,
+        tiercost_step
+    ):
+        """
+        Progressive built-in engine: the search pauses at each tier, and the tier is polygonized and written
+        to the sink (and the canvas preview) as soon as every node one tier past it is final, so Tier 1 shows
+        up long before the outer tiers are searched. Routes of a batch are done one after another, and
+        cancelation is checked between tiers.
+
+        Each pause bins the costs settled so far into the cumulative area of tiers 0..k, and the tier is that
+        area minus the one already written, so tiers nest exactly even though each comes from its own surface.
+        The surfaces grow tier by tier, so the whole run costs more than a one-shot run.
+        """
+        results = {}
+        tier_count = len(tier_specs)
+        is_batch = None not in routes_sources
+        tolerance = self.parameterAsDouble(parameters, 'SimplifyTolerance', context)
+        min_area = self.parameterAsDouble(parameters, 'MinPartArea', context)
+        if self.getTierSurfaceOutput(parameters, context):
+            model_feedback.reportError('Progressive runs build one surface per tier, TierSurface is not written')
+
+        field_route = self.getRouteIdField(parameters, context) if is_batch else None
+        sink, dest_id, fields = self.createServiceAreaSink(parameters, context, output_tablefields, crs, field_route)
+        preview = None
+        if self.parameterAsBool(parameters, 'PreviewOnCanvas', context):
+            preview = FCTierPreview.create(fields, crs, self.getResultsLayerTreeGroup)
 
-                    if tier_idx in tier_specs.keys():
-                        for k in newfields_keys:
-                            f[output_tablefields[k]['fname']
-                              ] = tier_specs[tier_idx][k]
+        try:
+            # Tier k is final once the search has settled everything up to one tier past it, the same fall-off
+            # margin a one-shot run searches to
+            thresholds = [tiercost_step * (tier_idx + 2) for tier_idx in range(tier_count)]
+            reach = self.getCostReachMeters(graph, edge_cost, thresholds[-1])
+            time_start = time.perf_counter()
+            for route_step, (route_id, source_nodes) in enumerate(routes_sources.items()):
+                if model_feedback.isCanceled():
+                    break
+                searches = graph.iterateMultiSourceDijkstra(
+                    source_nodes, thresholds, edge_cost, model_feedback, reach)
+                geom_lower = None
+                for tier_idx in range(tier_count):
+                    with tracker.stage('tierSearch'):
+                        searched = next(searches, None)
+                    if searched is None or model_feedback.isCanceled():
+                        break
+
+                    tier_geoms = self.generateTierGeometriesFromNodeCost(
+                        parameters,
+                        context,
+                        model_feedback,
+                        tracker,
+                        graph,
+                        searched[1],
+                        crs,
+                        tier_idx + 1,
+                        tiercost_step
+                    )
+                    if not tier_geoms:
+                        continue
+                    geom_upto = self.generalizeCumulativeTier(
+                        QgsGeometry.unaryUnion(list(tier_geoms.values())), geom_lower, tolerance, min_area)
+
+                    with tracker.stage('writeServiceAreas'):
+                        f = self.addTierFeature(sink, fields, tier_idx, self.differenceFromLowerTiers(geom_upto, geom_lower),
+                                                tier_specs, output_tablefields, [route_id] if is_batch else [])
+                        sink.flushBuffer()
+                    if preview is not None and f is not None:
+                        preview.tierReady.emit(f)
+                    geom_lower = geom_upto
+
+                    model_feedback.pushInfo(self.generateServiceAreasProgressive.__name__ +
+                                            ": %s%s written after %.1f s" % (
+                                                'Route %s: ' % route_id if is_batch else '',
+                                                tier_specs[tier_idx]['tier_name'], time.perf_counter() - time_start))
+                    model_feedback.setProgress(100.0 * (route_step * tier_count + tier_idx + 1) /
+                                               (len(routes_sources) * tier_count))
+                searches.close()
+        finally:
+            # Also on errors, so the preview layer never outlives the run
+            if preview is not None:
+                preview.finished.emit()
+
+        results['ServiceAreas'] = dest_id
+        return results
 
-                layer.updateFeature(f)
-            layer.updateFields()
+    def generateServiceAreasTiled(
+        self,
+        parameters,
+        context,
+        model_feedback,
+        tracker,
+        graph,
+        edge_cost,
+        routes_sources,
+        crs,
+        tier_specs,
+        output_tablefields,
+        tiercost_step,
+        tile_size
+    ):
+        """
+        Tiled built-in engine, for areas too large to search and rasterize in one piece. The reachable area is
+        cut into tile_size squares and every tile runs its own search on the subgraph within the search's
+        maximum reach of the tile: no path cheaper than the cutoff can leave that margin, so the tile's costs
+        are exact. Tiles are searched in a bounded stream (on the process pool where available), each one is
+        interpolated, binned and polygonized on its own, and its tier pieces are cut to the tile and written to
+        an intermediate layer; native:dissolve joins the pieces across tile seams into the final tiers.
+        Peak memory follows the tile size, not the size of the area.
+        """
+        results = {}
+        tier_count = len(tier_specs)
+        tiercost_cutoff = tiercost_step * (tier_count + 1)
+        is_batch = None not in routes_sources
+        in_memory = self.parameterAsBool(parameters, 'InMemoryPipeline', context)
+
+        reach = self.getCostReachMeters(graph, edge_cost, tiercost_cutoff)
+        # Nodes this far outside a tile still shape the interpolated surface at its edge, so their costs must
+        # be exact too: the search margin covers them as well
+        interp_margin = reach / (tier_count + 1)
+        if self.getTierSurfaceOutput(parameters, context):
+            model_feedback.reportError('Tiled runs build one surface per tile, TierSurface is not written')
+
+        field_route = self.getRouteIdField(parameters, context) if is_batch else None
+        fields = self.getServiceAreaFields(output_tablefields, field_route)
+        sink_pieces, dest_pieces = QgsProcessingUtils.createFeatureSink(
+            'memory:' if in_memory else QgsProcessingUtils.generateTempFilename('tile_pieces.gpkg'),
+            context, fields, QgsWkbTypes.MultiPolygon, crs)
+
+        for route_id, source_nodes in routes_sources.items():
+            tiles = self.getSearchTiles(graph, source_nodes, tile_size, reach + interp_margin)
+            model_feedback.pushInfo(self.generateServiceAreasTiled.__name__ +
+                                    ": %s%d tiles of %.0f m, %.0f m search margin" % (
+                                        'Route %s: ' % route_id if is_batch else '', len(tiles), tile_size,
+                                        reach + interp_margin))
+
+            tile_feedback = QgsProcessingMultiStepFeedback(len(tiles), model_feedback)
+            searches = self.iterateTileSearches(
+                graph, edge_cost, [tile[:1] + tile[2:] for tile in tiles], tiercost_cutoff, tile_feedback)
+            for tile_step in range(len(tiles)):
+                with tracker.stage('tileSearch'):
+                    tile_searched = next(searches, None)
+                if tile_searched is None or tile_feedback.isCanceled():
+                    break
+                tile_feedback.setCurrentStep(tile_step)
+
+                tile_idx, reached, reached_cost = tile_searched
+                tile_rect = tiles[tile_idx][1]
+                reached_xy = graph.node_xy[reached]
+                near = ((reached_xy[:, 0] >= tile_rect.xMinimum() - interp_margin) &
+                        (reached_xy[:, 0] <= tile_rect.xMaximum() + interp_margin) &
+                        (reached_xy[:, 1] >= tile_rect.yMinimum() - interp_margin) &
+                        (reached_xy[:, 1] <= tile_rect.yMaximum() + interp_margin))
+                if near.sum() < 3:
+                    continue
+
+                with tracker.stage('interpolateNodeCostRaster') as stage:
+                    stage['output'] = raster_cost = self.interpolateNodeCostRaster(
+                        context,
+                        tile_feedback,
+                        reached_xy[near],
+                        reached_cost[near],
+                        crs,
+                        parameters['CellSize'],
+                        tile_rect
+                    )
+                tier_geoms = self.generateTierGeometriesFromCostRaster(
+                    parameters,
+                    context,
+                    tracker,
+                    raster_cost,
+                    crs,
+                    tier_count,
+                    tiercost_step
+                )
 
-        with edit(layer):
-            # Delete old fields
-            lyr_fieldnamemap_final = prov.fieldNameMap()
-            lyr_fieldidxstodelete = [lyr_fieldnamemap_final[n]
-                                     for n in lyr_fieldnames_orig]
+                with tracker.stage('writeTilePieces'):
+                    geom_tile = QgsGeometry.fromRect(tile_rect)
+                    for tier_idx in sorted(tier_geoms):
+                        self.addTierFeature(sink_pieces, fields, tier_idx, tier_geoms[tier_idx].intersection(geom_tile),
+                                            tier_specs, output_tablefields, [route_id] if is_batch else [])
+            searches.close()
+            if model_feedback.isCanceled():
+                return results
 
-            prov.deleteAttributes(lyr_fieldidxstodelete)
-            layer.updateFields()
+        # Closing the sink flushes the pieces for the dissolve
+        sink_pieces = None
 
-        # Dissolve final service area polygon
+        # Dissolve tile pieces into final service area polygons
+        generalize = self.isGeneralizationRequested(parameters, context)
         alg_params = {
-            'FIELD': [output_tablefields['tier_num']['fname']],
-            'INPUT': vlayer_temp1,
-            # 'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
-            'OUTPUT': parameters['ServiceAreas']
+            'FIELD': ([field_route.name()] if is_batch else []) + [output_tablefields['tier_num']['fname']],
+            'INPUT': dest_pieces,
+            'OUTPUT': self.getIntermediateOutput(parameters, context) if generalize else parameters['ServiceAreas']
         }
-
-        vlayer_final = processing.run(
-            'native:dissolve', alg_params, context=context, feedback=feedback, is_child_algorithm=True
+        results['ServiceAreas'] = self.runChildAlgorithm(
+            tracker, 'native:dissolve', alg_params, context, model_feedback
         )['OUTPUT']
-
-        results['ServiceAreas'] = vlayer_final
+        if generalize:
+            results['ServiceAreas'] = self.writeGeneralizedTiers(
+                parameters, context, model_feedback, tracker, results['ServiceAreas'], tier_specs, output_tablefields,
+                field_route)
         return results
 
+    def getCostReachMeters(
+        self, graph, edge_cost, cutoff
+    ):
+        """
+        Farthest straight-line distance a search can get within cutoff: cutoff over the cheapest cost per meter
+        of any edge (1 for plain distance costs).
+        """
+        if edge_cost is None:
+            return cutoff
+        has_len = graph.edge_len > 0
+        rate = float((edge_cost[has_len] / graph.edge_len[has_len]).min()) if has_len.any() else 0.0
+        if rate <= 0:
+            raise QgsProcessingException('The network search needs a positive cost on every road')
+        return cutoff / rate
+
+    def getSearchTiles(
+        self, graph, source_nodes, tile_size, margin
+    ):
+        """
+        Tiles on a tile_size grid over everything within margin of the source nodes, as (tile index, tile
+        rectangle, search bounds = tile grown by margin, source nodes within the search bounds). Tiles that no
+        source can reach are left out.
+        """
+        sources_xy = graph.node_xy[source_nodes]
+        col0, row0 = np.floor((sources_xy.min(axis=0) - margin) / tile_size).astype(np.int64)
+        col1, row1 = np.floor((sources_xy.max(axis=0) + margin) / tile_size).astype(np.int64)
+        tiles = []
+        for row in range(int(row0), int(row1) + 1):
+            for col in range(int(col0), int(col1) + 1):
+                x0, y0 = col * tile_size, row * tile_size
+                bounds = (x0 - margin, y0 - margin, x0 + tile_size + margin, y0 + tile_size + margin)
+                in_bounds = ((sources_xy[:, 0] >= bounds[0]) & (sources_xy[:, 0] <= bounds[2]) &
+                             (sources_xy[:, 1] >= bounds[1]) & (sources_xy[:, 1] <= bounds[3]))
+                if in_bounds.any():
+                    tiles.append((len(tiles), QgsRectangle(x0, y0, x0 + tile_size, y0 + tile_size), bounds,
+                                  source_nodes[in_bounds]))
+        return tiles
+
+    def iterateTileSearches(
+        self, graph, edge_cost, tiles, cutoff, model_feedback
+    ):
+        """
+        Yields (tile index, reached node indices, their costs) for tiles of (tile index, search bounds, source
+        nodes), in completion order. On the process pool (Linux only, see canForkWorkers) at most two tiles
+        per worker are in flight, so finished searches never pile up faster than they are consumed.
+        """
+        import multiprocessing
+        import concurrent.futures
+        global _FC_WORKER_GRAPH, _FC_WORKER_EDGE_COST
+        workers = min(os.cpu_count() or 1, len(tiles))
+
+        if workers < 2 or not self.canForkWorkers():
+            for tile_idx, bounds, source_nodes in tiles:
+                if model_feedback.isCanceled():
+                    return
+                yield searchTileNodeCostsWorker(tile_idx, bounds, source_nodes, cutoff, graph, edge_cost)
+            return
+
+        registerWorkerModule()
+        _FC_WORKER_GRAPH = graph
+        _FC_WORKER_EDGE_COST = edge_cost
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+                tiles_pending = iter(tiles)
+                futures = set()
+                for tile_idx, bounds, source_nodes in tiles_pending:
+                    futures.add(executor.submit(searchTileNodeCostsWorker, tile_idx, bounds, source_nodes, cutoff))
+                    if len(futures) >= workers * 2:
+                        break
+                while futures:
+                    done, futures = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        if model_feedback.isCanceled():
+                            executor.shutdown(wait=False, cancel_futures=True)
+                            return
+                        yield future.result()
+                        tile_next = next(tiles_pending, None)
+                        if tile_next is not None:
+                            futures.add(executor.submit(searchTileNodeCostsWorker, *tile_next, cutoff))
+        finally:
+            _FC_WORKER_GRAPH = None
+            _FC_WORKER_EDGE_COST = None
+
+    def getResultCacheKey(
+        self, parameters, context, model_feedback
+    ):
+        """
+        Content hash of everything the service areas depend on: the route sketch geometries (and route ids),
+        the road network file identity (as for the graph cache), every parameter that changes the result and
+        the script source itself.
+        Returns None when the run can't be cached: a road network that isn't a plain file, or a TierSurface
+        request (only the service areas are cached).
+        """
+        if parameters.get('TierSurface'):
+            return None
+        roads_key = self.getRoadGraphCacheKey(parameters, context)
+        if roads_key is None:
+            model_feedback.pushInfo(self.getResultCacheKey.__name__ +
+                                    ": Road network is not a plain file layer, result cache and timing baseline skipped")
+            return None
+
+        params_key = dict(
+            (p.name(), parameters.get(p.name(), p.defaultValue()))
+            for p in self.parameterDefinitions()
+            if not p.isDestination() and p.name() not in self.RESULTCACHE_IGNORED_PARAMS
+        )
+        h = hashlib.sha1(json.dumps(
+            {'script_version': self.SCRIPT_VERSION, 'script': self.getScriptFingerprint(), 'roads': roads_key,
+             'parameters': params_key},
+            sort_keys=True, default=str).encode('utf-8'))
+
+        source_sketch = self.parameterAsSource(parameters, 'MainRouteSketch', context)
+        h.update((source_sketch.sourceCrs().authid() or source_sketch.sourceCrs().toWkt()).encode('utf-8'))
+        fid_routeid = self.parameterAsString(parameters, 'RouteIdField', context)
+        idx_routeid = source_sketch.fields().lookupField(fid_routeid) if fid_routeid else -1
+        request = QgsFeatureRequest()
+        if idx_routeid >= 0:
+            request.setSubsetOfAttributes([idx_routeid])
+        else:
+            request.setNoAttributes()
+        for f in source_sketch.getFeatures(request):
+            h.update(bytes(f.geometry().asWkb()) if f.hasGeometry() else b'')
+            if idx_routeid >= 0:
+                h.update(('|%s|' % f[idx_routeid]).encode('utf-8'))
+        return h.hexdigest()
+
+    def getScriptFingerprint(
+        self
+    ):
+        """
+        Hash of this script's source, so results cached before a code change aren't reused after it. None
+        when the script runs without a file (Script Editor Run).
+        """
+        if FC_SCRIPT_PATH is None:
+            return None
+        with open(FC_SCRIPT_PATH, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def copyLayerToServiceAreas(
+        self, parameters, context, path
+    ):
+        """
+        Copies a cached service area GeoPackage into the ServiceAreas sink (without the GeoPackage fid).
+        """
+        layer = QgsVectorLayer(path, 'service_areas_cached', 'ogr')
+        pk_indexes = set(layer.dataProvider().pkAttributeIndexes())
+        idx_copied = [i for i in range(layer.fields().count()) if i not in pk_indexes]
+        fields = QgsFields()
+        for i in idx_copied:
+            fields.append(layer.fields().at(i))
+
+        sink, dest_id = self.parameterAsSink(
+            parameters, 'ServiceAreas', context, fields, layer.wkbType(), layer.crs())
+        for f in layer.getFeatures():
+            f_out = QgsFeature(fields)
+            f_out.setGeometry(f.geometry())
+            f_out.setAttributes([f.attributes()[i] for i in idx_copied])
+            sink.addFeature(f_out, QgsFeatureSink.FastInsert)
+        return dest_id
+
+    def getCostCacheKey(
+        self, graph, source_nodes, cost_model
+    ):
+        h = hashlib.sha1(graph.fingerprint().encode('utf-8'))
+        h.update(np.ascontiguousarray(np.sort(source_nodes), dtype=np.int64).tobytes())
+        h.update(json.dumps(cost_model, sort_keys=True).encode('utf-8'))
+        return h.hexdigest()
+
+    def getCostModel(
+        self, parameters, context
+    ):
+        """
+        Cost model and rates. Distance runs ignore the rates and speeds, so they are left out and don't split
+        the cost cache.
+        """
+        model = self.parameterAsEnum(parameters, 'CostModel', context)
+        if model != self.COST_GENERALIZED:
+            return {'model': self.COST_DISTANCE}
+        return {
+            'model': self.COST_GENERALIZED,
+            'per_mile': self.parameterAsDouble(parameters, 'CostPerMile', context),
+            'per_hour': self.parameterAsDouble(parameters, 'CostPerHour', context),
+            'avg_speed': float(parameters['CostAvgSpeed']),
+            'speed_field': self.parameterAsString(parameters, 'SpeedField', context) or None
+        }
+
+    def getTierCostStep(
+        self, cost_model, distcost_pertier_mi
+    ):
+        """
+        Cost of one tier: MilesPerTier in meters, or for generalized cost what driving MilesPerTier at the
+        average speed costs, so tiers keep their mileage meaning on average roads.
+        """
+        if cost_model['model'] != self.COST_GENERALIZED:
+            return self.convertMilesToMeters(distcost_pertier_mi)
+        return distcost_pertier_mi * (cost_model['per_mile'] + cost_model['per_hour'] / cost_model['avg_speed'])
+
+    def loadCachedNodeCosts(
+        self, cache_key, cutoff
+    ):
+        """
+        Cached (reached nodes, costs) trimmed to cutoff, or None if missing or searched less far than cutoff.
+        """
+        cache_dir = os.path.join(FC_COSTCACHE_DIR, cache_key)
+        try:
+            with np.load(os.path.join(cache_dir, 'costs.npz')) as cached:
+                if float(cached['cutoff']) < cutoff:
+                    return None
+                reached = cached['reached']
+                reached_cost = cached['cost']
+            os.utime(cache_dir)
+        except (OSError, KeyError, ValueError):
+            return None
+        in_cutoff = reached_cost <= cutoff
+        return reached[in_cutoff], reached_cost[in_cutoff]
+
+    def saveCachedNodeCosts(
+        self, cache_key, reached, reached_cost, cutoff
+    ):
+        cache_dir = os.path.join(FC_COSTCACHE_DIR, cache_key)
+        # New costs invalidate every tier geometry binned from the old ones
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        try:
+            os.makedirs(cache_dir)
+            np.savez(os.path.join(cache_dir, 'costs.npz'), reached=reached, cost=reached_cost, cutoff=cutoff)
+        except OSError:
+            return
+        self.pruneCacheDir(FC_COSTCACHE_DIR, FC_COSTCACHE_MAX_ENTRIES)
+
+    def loadCachedTierGeometries(
+        self, cache_key, tiers_cachekey
+    ):
+        path = os.path.join(FC_COSTCACHE_DIR, cache_key, 'tiers.json')
+        try:
+            with open(path) as fp:
+                tiers_wkb = json.load(fp).get(tiers_cachekey)
+        except (OSError, ValueError):
+            return None
+        if tiers_wkb is None:
+            return None
+
+        tier_geoms = {}
+        for tier_idx, wkb_hex in tiers_wkb.items():
+            geom = QgsGeometry()
+            geom.fromWkb(bytes.fromhex(wkb_hex))
+            tier_geoms[int(tier_idx)] = geom
+        return tier_geoms
+
+    def saveCachedTierGeometries(
+        self, cache_key, tiers_cachekey, tier_geoms
+    ):
+        path = os.path.join(FC_COSTCACHE_DIR, cache_key, 'tiers.json')
+        try:
+            with open(path) as fp:
+                tiers_cached = json.load(fp)
+        except (OSError, ValueError):
+            tiers_cached = {}
+        tiers_cached[tiers_cachekey] = dict(
+            (str(tier_idx), bytes(geom.asWkb()).hex()) for tier_idx, geom in tier_geoms.items())
+        try:
+            with open(path, 'w') as fp:
+                json.dump(tiers_cached, fp)
+        except OSError:
+            pass
+
+    def pruneCacheDir(
+        self, cache_root, max_entries=None, max_bytes=None
+    ):
+        """
+        Removes the least recently used entries (subdirectories, by mtime) beyond max_entries, or beyond a
+        total size of max_bytes.
+        """
+        try:
+            entries = [os.path.join(cache_root, n) for n in os.listdir(cache_root)]
+        except OSError:
+            return
+        entries = sorted((e for e in entries if os.path.isdir(e) and not e.endswith('.tmp')),
+                         key=os.path.getmtime, reverse=True)
+        total_bytes = 0
+        for count, entry in enumerate(entries):
+            if max_bytes is not None:
+                total_bytes += sum(os.path.getsize(os.path.join(d, n)) for d, _, names in os.walk(entry) for n in names)
+            if (max_entries is not None and count >= max_entries) or (max_bytes is not None and total_bytes > max_bytes):
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def generateTierGeometriesFromNodeCost(
+        self,
+        parameters,
+        context,
+        model_feedback,
+        tracker,
+        graph,
+        node_cost,
+        crs,
+        tier_count,
+        tiercost_step,
+        raster_output=None
+    ):
+        """
+        Node costs -> interpolated cost surface -> tier raster -> one geometry per 0-based tier index.
+        """
+        reached = np.flatnonzero(np.isfinite(node_cost))
+        with tracker.stage('interpolateNodeCostRaster') as stage:
+            stage['output'] = raster_cost = self.interpolateNodeCostRaster(
+                context,
+                model_feedback,
+                graph.node_xy[reached],
+                node_cost[reached],
+                crs,
+                parameters['CellSize']
+            )
+
+        return self.generateTierGeometriesFromCostRaster(
+            parameters,
+            context,
+            tracker,
+            raster_cost,
+            crs,
+            tier_count,
+            tiercost_step,
+            raster_output
+        )
+
+    def generateTierGeometriesFromCostRaster(
+        self,
+        parameters,
+        context,
+        tracker,
+        raster_cost,
+        crs,
+        tier_count,
+        tiercost_step,
+        raster_output=None
+    ):
+        """
+        Cost raster -> byte raster of tier numbers -> one polygonize -> one geometry per 0-based tier index.
+        The tier raster is kept at raster_output when given (the TierSurface output).
+        """
+        from osgeo import gdal
+        # The tier raster only feeds the polygonize step, so in memory mode it never touches the disk
+        if raster_output:
+            raster_tiers = raster_output
+        elif self.parameterAsBool(parameters, 'InMemoryPipeline', context):
+            raster_tiers = '/vsimem/' + os.path.basename(QgsProcessingUtils.generateTempFilename('tiers.tif'))
+        else:
+            raster_tiers = QgsProcessingUtils.generateTempFilename('tiers.tif')
+        with tracker.stage('classifyCostRasterToTiers') as stage:
+            stage['output'] = self.classifyCostRasterToTiers(
+                raster_cost,
+                crs,
+                tier_count,
+                tiercost_step,
+                raster_tiers
+            )
+            if raster_tiers.startswith('/vsimem/'):
+                stage['bytes'] = gdal.VSIStatL(raster_tiers).size
+                stage['in_memory'] = True
+
+        with tracker.stage('polygonizeTierRaster'):
+            tier_geoms = self.polygonizeTierRaster(raster_tiers)
+        if raster_tiers.startswith('/vsimem/'):
+            gdal.Unlink(raster_tiers)
+        return tier_geoms
+
+    def getTierSurfaceOutput(
+        self, parameters, context
+    ):
+        """
+        Destination path of the optional TierSurface raster, or None when it wasn't requested.
+        """
+        if not parameters.get('TierSurface'):
+            return None
+        return self.parameterAsOutputLayer(parameters, 'TierSurface', context) or None
+
+    def canForkWorkers(self):
+        """
+        Whether searches may run on a forked process pool. Only on Linux: macOS offers fork too, but forking
+        the multi-threaded Cocoa/Qt QGIS process from a Processing task thread is unsafe there.
+        """
+        import multiprocessing
+        return sys.platform.startswith('linux') and 'fork' in multiprocessing.get_all_start_methods()
+
+    def searchRoutesInParallel(
+        self, graph, routes_sources, cutoff, reach, model_feedback, edge_cost=None
+    ):
+        """
+        One multi-source search per route, fanned out over a process pool with a worker per core. Workers are
+        forked after the graph and edge costs are published, so they read its arrays instead of receiving a
+        pickled copy, and only send back the reached nodes. Each search builds its lists from the subgraph
+        within reach of its route, so a worker's memory follows the route, not the network. Only Linux forks
+        (see canForkWorkers), elsewhere the routes are searched serially. Returns route id -> (reached node
+        indices, their costs).
+        """
+        import multiprocessing
+        import concurrent.futures
+        global _FC_WORKER_GRAPH, _FC_WORKER_EDGE_COST
+        routes_reached = {}
+        workers = min(os.cpu_count() or 1, len(routes_sources))
+
+        if workers < 2 or not self.canForkWorkers():
+            for route_step, (route_id, source_nodes) in enumerate(routes_sources.items()):
+                if model_feedback.isCanceled():
+                    break
+                routes_reached[route_id] = searchRouteNodeCostsWorker(
+                    route_id, source_nodes, cutoff, reach, graph, edge_cost)[1:]
+                model_feedback.setProgress(100.0 * (route_step + 1) / len(routes_sources))
+            return routes_reached
+
+        model_feedback.pushInfo(self.searchRoutesInParallel.__name__ +
+                                ": Searching %d routes on %d worker processes" % (len(routes_sources), workers))
+        registerWorkerModule()
+        _FC_WORKER_GRAPH = graph
+        _FC_WORKER_EDGE_COST = edge_cost
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+                futures = [
+                    executor.submit(searchRouteNodeCostsWorker, route_id, source_nodes, cutoff, reach)
+                    for route_id, source_nodes in routes_sources.items()
+                ]
+                for route_step, future in enumerate(concurrent.futures.as_completed(futures)):
+                    if model_feedback.isCanceled():
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        break
+                    route_id, reached, reached_cost = future.result()
+                    routes_reached[route_id] = (reached, reached_cost)
+                    model_feedback.setProgress(100.0 * (route_step + 1) / len(futures))
+        finally:
+            _FC_WORKER_GRAPH = None
+            _FC_WORKER_EDGE_COST = None
+        return routes_reached
+
+    def getRouteIdField(
+        self, parameters, context
+    ):
+        source_sketch = self.parameterAsSource(parameters, 'MainRouteSketch', context)
+        field_route = QgsField(source_sketch.fields().field(
+            self.parameterAsString(parameters, 'RouteIdField', context)))
+        field_route.setName('ROUTEID')
+        return field_route
+
+    def getRoadGraphCacheKey(
+        self, parameters, context
+    ):
+        """
+        Identity of the road network source for the graph cache: source uri, file modification time/size, CRS
+        and the speed field read into the graph. Returns None for anything that can't be keyed reliably
+        (non-file providers, selections).
+        """
+        param_roads = parameters['RoadNetwork']
+        if isinstance(param_roads, QgsProcessingFeatureSourceDefinition) and param_roads.selectedFeaturesOnly:
+            return None
+
+        layer = self.parameterAsVectorLayer(parameters, 'RoadNetwork', context)
+        if layer is None or layer.providerType() != 'ogr':
+            return None
+
+        path = QgsProviderRegistry.instance().decodeUri(layer.providerType(), layer.source()).get('path')
+        if not path or not os.path.isfile(path):
+            return None
+
+        return {
+            'version': FCRoadGraph.CACHE_VERSION,
+            'source': layer.source(),
+            'subset': layer.subsetString(),
+            'mtime': os.path.getmtime(path),
+            'size': os.path.getsize(path),
+            'crs': layer.crs().authid() or layer.crs().toWkt(),
+            'speed_field': self.parameterAsString(parameters, 'SpeedField', context) or None
+        }
+
+    def loadCachedRoadGraph(
+        self, parameters, context, model_feedback
+    ):
+        """
+        Returns the compiled graph of the whole road network from the on-disk cache, building and storing it
+        on a cold run. A changed file, CRS or subset changes the key, and the stale entry is overwritten.
+        """
+        cache_key = self.getRoadGraphCacheKey(parameters, context)
+        if cache_key is None:
+            model_feedback.pushInfo(self.loadCachedRoadGraph.__name__ +
+                                    ": Road network is not a plain file layer, graph cache skipped")
+            return None
+
+        cache_dir = os.path.join(
+            FC_GRAPHCACHE_DIR,
+            hashlib.sha1((cache_key['source'] + '|' + cache_key['subset']).encode('utf-8')).hexdigest()[:16]
+        )
+        graph = FCRoadGraph.load(cache_dir, cache_key)
+        if graph is not None:
+            model_feedback.pushInfo(self.loadCachedRoadGraph.__name__ +
+                                    ": Using cached road graph " + cache_dir)
+            return graph
+
+        model_feedback.pushInfo(self.loadCachedRoadGraph.__name__ +
+                                ": Building road graph cache " + cache_dir)
+        graph = FCRoadGraph.fromLineLayer(
+            self.parameterAsVectorLayer(parameters, 'RoadNetwork', context), model_feedback,
+            speed_field=cache_key['speed_field'])
+        if model_feedback.isCanceled():
+            return None
+        graph.save(cache_dir, cache_key)
+        return graph
+
+    def getLayerPointsXY(
+        self, layer
+    ):
+        points_xy = []
+        for f in layer.getFeatures(QgsFeatureRequest().setNoAttributes()):
+            geom = f.geometry()
+            if geom.isNull() or geom.isEmpty():
+                continue
+            pts = geom.asMultiPoint() if geom.isMultipart() else [geom.asPoint()]
+            points_xy.extend((pt.x(), pt.y()) for pt in pts)
+        return np.array(points_xy, dtype=np.float64).reshape(-1, 2)
+
+    def getIntersectionGrid(
+        self, intersections_xy
+    ):
+        """
+        Unique intersections bucketed into a grid with one snap distance per cell, for
+        snapSketchToIntersections. Returns (unique intersections (x, y), grid cell -> intersection indices).
+        """
+        snap_dist = float(self.ROUTEPOINT_SNAP_M)
+
+        # Duplicate hits (A x B and B x A, or shared junctions) collapse onto one id here
+        nodes_xy = np.unique(np.round(intersections_xy, 3), axis=0)
+        cells_xy = np.floor(nodes_xy / snap_dist).astype(np.int64)
+        cells, cell_inverse = np.unique(cells_xy, axis=0, return_inverse=True)
+        cell_inverse = cell_inverse.reshape(-1)
+        cell_order = np.argsort(cell_inverse, kind='stable')
+        cell_bounds = np.searchsorted(cell_inverse[cell_order], np.arange(len(cells) + 1))
+        grid = dict(
+            ((cx, cy), cell_order[cell_bounds[i]:cell_bounds[i + 1]]) for i, (cx, cy) in enumerate(cells.tolist())
+        )
+        return nodes_xy, grid
+
+    def snapSketchToIntersections(
+        self,
+        parameters,
+        context,
+        model_feedback,
+        intersections,
+        crs,
+        fid_uniqueid,
+        request=None
+    ):
+        """
+        Unique road intersections within ROUTEPOINT_SNAP_M of the route sketch, as a memory point layer
+        numbered by fid_uniqueid. Returns the layer id (held in the context's temporary layer store).
+        intersections is the grid from getIntersectionGrid, built once for all routes of a batch. An
+        optional request limits the sketch features used (one route of a batch).
+
+        Every sketch segment measures only the intersections in the grid cells around it, so the whole sketch
+        is matched in one pass without buffering, extracting or dissolving intermediate layers.
+        """
+        snap_dist = float(self.ROUTEPOINT_SNAP_M)
+        nodes_xy, grid = intersections
+
+        source_sketch = self.parameterAsSource(parameters, 'MainRouteSketch', context)
+        transform = QgsCoordinateTransform(source_sketch.sourceCrs(), crs, context.transformContext())
+        # Long sketch segments are cut into pieces so no single lookup spans a large block of cells
+        piece_len = snap_dist * 8
+        hits = [np.zeros(0, dtype=np.int64)]
+
+        def nodesNearSegment(x0, y0, x1, y1):
+            cx0, cy0 = (int(np.floor((min(x0, x1) - snap_dist) / snap_dist)),
+                        int(np.floor((min(y0, y1) - snap_dist) / snap_dist)))
+            cx1, cy1 = (int(np.floor((max(x0, x1) + snap_dist) / snap_dist)),
+                        int(np.floor((max(y0, y1) + snap_dist) / snap_dist)))
+            cand = [grid[(cx, cy)] for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1) if (cx, cy) in grid]
+            if not cand:
+                return
+            cand = np.concatenate(cand)
+            px = nodes_xy[cand, 0] - x0
+            py = nodes_xy[cand, 1] - y0
+            dx = x1 - x0
+            dy = y1 - y0
+            seg_len2 = dx * dx + dy * dy
+            t = np.clip((px * dx + py * dy) / seg_len2, 0, 1) if seg_len2 > 0 else 0
+            hits.append(cand[np.hypot(px - t * dx, py - t * dy) <= snap_dist])
+
+        request = QgsFeatureRequest(request) if request is not None else QgsFeatureRequest()
+        for f in source_sketch.getFeatures(request):
+            if model_feedback.isCanceled():
+                break
+            geom = f.geometry()
+            if geom.isNull() or geom.isEmpty():
+                continue
+            geom.transform(transform)
+
+            geom_type = QgsWkbTypes.geometryType(geom.wkbType())
+            if geom_type == QgsWkbTypes.PointGeometry:
+                pts = geom.asMultiPoint() if geom.isMultipart() else [geom.asPoint()]
+                lines = [[pt] for pt in pts]
+            elif geom_type == QgsWkbTypes.PolygonGeometry:
+                polys = geom.asMultiPolygon() if geom.isMultipart() else [geom.asPolygon()]
+                lines = [ring for poly in polys for ring in poly]
+                # Intersections strictly inside the polygon are within the snap distance too
+                bbox = geom.boundingBox()
+                in_bbox = np.flatnonzero(
+                    (nodes_xy[:, 0] >= bbox.xMinimum()) & (nodes_xy[:, 0] <= bbox.xMaximum()) &
+                    (nodes_xy[:, 1] >= bbox.yMinimum()) & (nodes_xy[:, 1] <= bbox.yMaximum()))
+                engine = QgsGeometry.createGeometryEngine(geom.constGet())
+                engine.prepareGeometry()
+                hits.append(np.array(
+                    [n for n in in_bbox.tolist() if engine.intersects(QgsPoint(*nodes_xy[n]))], dtype=np.int64))
+            else:
+                lines = geom.asMultiPolyline() if geom.isMultipart() else [geom.asPolyline()]
+
+            for line in lines:
+                line_xy = [(pt.x(), pt.y()) for pt in line]
+                if len(line_xy) == 1:
+                    line_xy = line_xy * 2
+                for (x0, y0), (x1, y1) in zip(line_xy[:-1], line_xy[1:]):
+                    pieces = max(int(np.ceil(np.hypot(x1 - x0, y1 - y0) / piece_len)), 1)
+                    for k in range(pieces):
+                        nodesNearSegment(x0 + (x1 - x0) * k / pieces, y0 + (y1 - y0) * k / pieces,
+                                         x0 + (x1 - x0) * (k + 1) / pieces, y0 + (y1 - y0) * (k + 1) / pieces)
+
+        routepoint_nodes = np.unique(np.concatenate(hits))
+
+        vlayer_routepoints = QgsVectorLayer('Point?field=%s:integer' % fid_uniqueid, 'route_points', 'memory')
+        vlayer_routepoints.setCrs(crs)
+        feats = []
+        for uniqueid, node in enumerate(routepoint_nodes.tolist()):
+            f = QgsFeature()
+            f.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(*nodes_xy[node])))
+            f.setAttributes([uniqueid])
+            feats.append(f)
+        vlayer_routepoints.dataProvider().addFeatures(feats)
+
+        model_feedback.pushInfo(self.snapSketchToIntersections.__name__ +
+                                ": Route points feature count = %d (from %d intersections)" % (len(feats), len(nodes_xy)))
+
+        context.temporaryLayerStore().addMapLayer(vlayer_routepoints)
+        return vlayer_routepoints.id()
+
+    def thinRoutePoints(
+        self,
+        context,
+        model_feedback,
+        vlayer_routepoints,
+        cell_size,
+        tiercost_step_m,
+        fid_uniqueid
+    ):
+        """
+        Keeps one route point per cell_size grid cell, the one nearest the mean of the cell's points, and
+        renumbers fid_uniqueid. Returns the thinned memory layer's id.
+
+        Every dropped point has a kept point in its own cell, so tier boundaries move by at most the cell
+        diagonal in straight-line terms; the offsets actually introduced are reported against the tier width.
+        """
+        layer = context.getMapLayer(vlayer_routepoints)
+        points_xy = self.getLayerPointsXY(layer)
+        if len(points_xy) == 0:
+            return vlayer_routepoints
+
+        cells, cell_inverse = np.unique(np.floor(points_xy / cell_size).astype(np.int64), axis=0, return_inverse=True)
+        cell_inverse = cell_inverse.reshape(-1)
+        cell_counts = np.bincount(cell_inverse)
+        cell_mean = np.column_stack((
+            np.bincount(cell_inverse, points_xy[:, 0]) / cell_counts,
+            np.bincount(cell_inverse, points_xy[:, 1]) / cell_counts))
+        dist_mean = np.hypot(*(points_xy - cell_mean[cell_inverse]).T)
+        order = np.lexsort((dist_mean, cell_inverse))
+        kept = order[np.searchsorted(cell_inverse[order], np.arange(len(cells)))]
+
+        cell_kept = np.empty(len(cells), dtype=np.int64)
+        cell_kept[cell_inverse[kept]] = kept
+        offset_max = float(np.hypot(*(points_xy - points_xy[cell_kept[cell_inverse]]).T).max())
+
+        vlayer_thinned = QgsVectorLayer('Point?field=%s:integer' % fid_uniqueid, 'route_points', 'memory')
+        vlayer_thinned.setCrs(layer.crs())
+        feats = []
+        for uniqueid, (x, y) in enumerate(points_xy[np.sort(kept)].tolist()):
+            f = QgsFeature()
+            f.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(x, y)))
+            f.setAttributes([uniqueid])
+            feats.append(f)
+        vlayer_thinned.dataProvider().addFeatures(feats)
+
+        model_feedback.pushInfo(self.thinRoutePoints.__name__ +
+                                ": Route points %d -> %d (%.1fx fewer searches) on a %.0f m grid; worst offset "
+                                "%.0f m = %.1f%% of a tier (bound %.0f m)" % (
+                                    len(points_xy), len(feats), float(len(points_xy)) / len(feats), cell_size,
+                                    offset_max, 100.0 * offset_max / tiercost_step_m, cell_size * np.sqrt(2)))
+
+        context.temporaryLayerStore().addMapLayer(vlayer_thinned)
+        return vlayer_thinned.id()
+
+    def interpolateNodeCostRaster(
+        self,
+        context,
+        model_feedback,
+        nodes_xy,
+        nodes_cost,
+        crs,
+        cell_size,
+        extent=None
+    ):
+        """
+        Writes a TIN-interpolated cost surface (ESRI ASCII grid) from reached graph nodes (their (x, y) and
+        cost), covering extent or, by default, the nodes' bounding box.
+        """
+        from qgis.analysis import QgsInterpolator
+        from qgis.analysis import QgsTinInterpolator
+        from qgis.analysis import QgsGridFileWriter
+        if len(nodes_xy) < 3:
+            raise QgsProcessingException('Too few reachable road nodes to build a cost surface')
+
+        vlayer_nodecost = QgsVectorLayer('Point?field=cost:double', 'node_cost', 'memory')
+        vlayer_nodecost.setCrs(crs)
+        feats = []
+        for (x, y), cost in zip(nodes_xy.tolist(), nodes_cost.tolist()):
+            f = QgsFeature()
+            f.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(x, y)))
+            f.setAttributes([cost])
+            feats.append(f)
+        vlayer_nodecost.dataProvider().addFeatures(feats)
+
+        layer_data = QgsInterpolator.LayerData()
+        layer_data.source = vlayer_nodecost
+        layer_data.valueSource = QgsInterpolator.ValueAttribute
+        layer_data.interpolationAttribute = 0
+        layer_data.sourceType = QgsInterpolator.SourcePoints
+        interpolator = QgsTinInterpolator([layer_data], QgsTinInterpolator.Linear)
+
+        if extent is not None:
+            xy_min = (extent.xMinimum(), extent.yMinimum())
+            xy_max = (extent.xMaximum(), extent.yMaximum())
+        else:
+            xy_min = nodes_xy.min(axis=0)
+            xy_max = nodes_xy.max(axis=0)
+        cols = max(int(np.ceil((xy_max[0] - xy_min[0]) / cell_size)), 1)
+        rows = max(int(np.ceil((xy_max[1] - xy_min[1]) / cell_size)), 1)
+        extent = QgsRectangle(xy_min[0], xy_min[1], xy_min[0] + cols * cell_size, xy_min[1] + rows * cell_size)
+
+        raster_cost = QgsProcessingUtils.generateTempFilename('nodecost.asc')
+        QgsGridFileWriter(interpolator, raster_cost, extent, cols, rows).writeFile(model_feedback)
+        return raster_cost
+
+    def classifyCostRasterToTiers(
+        self,
+        raster_cost,
+        crs,
+        tier_count,
+        tiercost_step,
+        raster_output
+    ):
+        """
+        Bins a cost raster into a byte raster of 1-based tier numbers (0 = nodata / beyond the last tier).
+        """
+        from osgeo import gdal
+        ds_cost = gdal.Open(raster_cost)
+        band_cost = ds_cost.GetRasterBand(1)
+        cost = band_cost.ReadAsArray().astype(np.float64)
+        nodata = band_cost.GetNoDataValue()
+
+        valid = np.isfinite(cost) & (cost >= 0)
+        if nodata is not None:
+            valid &= cost != nodata
+
+        tiernums = np.zeros(cost.shape, dtype=np.float64)
+        tiernums[valid] = np.maximum(np.ceil(cost[valid] / tiercost_step), 1)
+        tiernums[tiernums > tier_count] = 0
+
+        ds_tiers = gdal.GetDriverByName('GTiff').Create(
+            raster_output, ds_cost.RasterXSize, ds_cost.RasterYSize, 1, gdal.GDT_Byte, ['COMPRESS=DEFLATE'])
+        ds_tiers.SetGeoTransform(ds_cost.GetGeoTransform())
+        ds_tiers.SetProjection(crs.toWkt())
+        band_tiers = ds_tiers.GetRasterBand(1)
+        band_tiers.WriteArray(tiernums.astype(np.uint8))
+        band_tiers.SetNoDataValue(0)
+        band_tiers.FlushCache()
+        ds_tiers = None
+        ds_cost = None
+        return raster_output
+
+    def polygonizeTierRaster(
+        self, raster_tiers
+    ):
+        """
+        Polygonizes a tier raster in process (OGR memory datasource) and unions the pieces into one geometry
+        per 0-based tier index, so no intermediate polygon layer is written.
+        """
+        from osgeo import gdal
+        from osgeo import ogr
+        ds_tiers = gdal.Open(raster_tiers)
+        band_tiers = ds_tiers.GetRasterBand(1)
+        ds_polygons = ogr.GetDriverByName('Memory').CreateDataSource('tier_polygons')
+        lyr_polygons = ds_polygons.CreateLayer('tier_polygons', geom_type=ogr.wkbPolygon)
+        lyr_polygons.CreateField(ogr.FieldDefn('tier_num', ogr.OFTInteger))
+        gdal.Polygonize(band_tiers, band_tiers.GetMaskBand(), lyr_polygons, 0, [])
+
+        parts = {}
+        for f in lyr_polygons:
+            geom = QgsGeometry()
+            geom.fromWkb(bytes(f.GetGeometryRef().ExportToWkb()))
+            parts.setdefault(f.GetField(0) - 1, []).append(geom)
+        ds_polygons = None
+        ds_tiers = None
+        return dict((tier_idx, QgsGeometry.unaryUnion(geoms)) for tier_idx, geoms in parts.items())
+
+    def getServiceAreaFields(
+        self, output_tablefields, field_route=None
+    ):
+        fields = QgsFields()
+        if field_route is not None:
+            fields.append(field_route)
+        for v in output_tablefields.values():
+            fields.append(v['qfieldobj'])
+        return fields
+
+    def createServiceAreaSink(
+        self, parameters, context, output_tablefields, crs, field_route=None
+    ):
+        fields = self.getServiceAreaFields(output_tablefields, field_route)
+        sink, dest_id = self.parameterAsSink(
+            parameters, 'ServiceAreas', context, fields, QgsWkbTypes.MultiPolygon, crs)
+        return sink, dest_id, fields
+
+    def addTierFeature(
+        self, sink, fields, tier_idx, geom, tier_specs, output_tablefields, attrs_prefix=()
+    ):
+        if tier_idx not in tier_specs or geom is None or geom.isEmpty():
+            return
+        geom = QgsGeometry(geom)
+        geom.convertToMultiType()
+        f = QgsFeature(fields)
+        f.setGeometry(geom)
+        f.setAttributes(list(attrs_prefix) + [tier_specs[tier_idx][k] for k in output_tablefields])
+        sink.addFeature(f, QgsFeatureSink.FastInsert)
+        return f
+
     def getLayerAttrNames(
         self, layer
     ):
@@ -451,11 +2858,154 @@ class FCServiceAreaV30(QgsProcessingAlgorithm):
                     '______Feat (%d) attr map: %s' % (f.id(), str(f_attrmap))
                 )
 
+    def finishRun(
+        self, tracker, parameters, context, model_feedback, results
+    ):
+        """
+        Logs the stage profile and writes the optional JSON ProfileReport.
+        """
+        report_path = None
+        if parameters.get('ProfileReport'):
+            report_path = self.parameterAsFileOutput(parameters, 'ProfileReport', context)
+        metadata = {
+            'algorithm': self.name(),
+            'script_version': self.SCRIPT_VERSION,
+            'qgis_version': Qgis.QGIS_VERSION,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(tracker.time_started)),
+            'parameters': dict((k, v if isinstance(v, (int, float, bool, type(None))) else str(v))
+                               for k, v in parameters.items())
+        }
+        tracker.report(context, model_feedback, report_path, metadata)
+        if report_path:
+            results['ProfileReport'] = report_path
+        return results
+
+    def getIntermediateOutput(
+        self, parameters, context
+    ):
+        if self.parameterAsBool(parameters, 'InMemoryPipeline', context):
+            return 'memory:'
+        return QgsProcessing.TEMPORARY_OUTPUT
+
+    def runChildAlgorithm(
+        self, tracker, alg_id, alg_params, context, model_feedback, output_key='OUTPUT'
+    ):
+        with tracker.stage(alg_id) as stage:
+            stage['input'] = alg_params.get('INPUT', alg_params.get('POLYGONS'))
+            alg_results = processing.run(
+                alg_id, alg_params, context=context, feedback=model_feedback, is_child_algorithm=True
+            )
+            stage['output'] = alg_results.get(output_key)
+        return alg_results
+
+    def clipRoadNetworkToBuffer(
+        self,
+        parameters,
+        context,
+        model_feedback,
+        vlayer_buffer
+    ):
+        """
+        Road network clipped to the buffer polygon, as a memory line layer with the road attributes. Returns
+        the layer id (held in the context's temporary layer store).
+
+        Candidates come from the road layer's spatial index (created on the data source the first time, then
+        reused by every later run), so roads outside the buffer's bounding box are never read. The buffer's
+        box is split into a grid of cells classed inside / boundary / outside against the prepared buffer:
+        roads whose box only covers inside cells are taken as they are, roads only covering outside cells are
+        dropped, and only the rest get an exact intersection.
+        """
+        layer_roads = self.parameterAsVectorLayer(parameters, 'RoadNetwork', context)
+        if layer_roads is not None:
+            prov = layer_roads.dataProvider()
+            if (prov.hasSpatialIndex() == QgsFeatureSource.SpatialIndexNotPresent and
+                    prov.capabilities() & QgsVectorDataProvider.CreateSpatialIndex):
+                model_feedback.pushInfo(self.clipRoadNetworkToBuffer.__name__ +
+                                        ": Creating spatial index on " + layer_roads.source())
+                prov.createSpatialIndex()
+        source_roads = self.parameterAsSource(parameters, 'RoadNetwork', context)
+
+        layer_buffer = context.getMapLayer(vlayer_buffer)
+        geom_buffer = QgsGeometry.unaryUnion([f.geometry() for f in layer_buffer.getFeatures() if f.hasGeometry()])
+        if layer_buffer.crs() != source_roads.sourceCrs():
+            geom_buffer.transform(QgsCoordinateTransform(
+                layer_buffer.crs(), source_roads.sourceCrs(), context.transformContext()))
+        engine = QgsGeometry.createGeometryEngine(geom_buffer.constGet())
+        engine.prepareGeometry()
+
+        CELL_OUTSIDE, CELL_BOUNDARY, CELL_INSIDE = 0, 1, 2
+        bbox = geom_buffer.boundingBox()
+        cell_size = max(bbox.width(), bbox.height()) / self.CLIP_GRID_CELLS or 1.0
+        cols = max(int(np.ceil(bbox.width() / cell_size)), 1)
+        rows = max(int(np.ceil(bbox.height() / cell_size)), 1)
+        cells = np.zeros((rows, cols), dtype=np.int8)
+        for row in range(rows):
+            for col in range(cols):
+                cell = QgsGeometry.fromRect(QgsRectangle(
+                    bbox.xMinimum() + col * cell_size, bbox.yMinimum() + row * cell_size,
+                    bbox.xMinimum() + (col + 1) * cell_size, bbox.yMinimum() + (row + 1) * cell_size))
+                if engine.contains(cell.constGet()):
+                    cells[row, col] = CELL_INSIDE
+                elif engine.intersects(cell.constGet()):
+                    cells[row, col] = CELL_BOUNDARY
+
+        vlayer_clipped = QgsVectorLayer('MultiLineString', 'roads_clipped', 'memory')
+        vlayer_clipped.setCrs(source_roads.sourceCrs())
+        vlayer_clipped.dataProvider().addAttributes(source_roads.fields().toList())
+        vlayer_clipped.updateFields()
+
+        feats = []
+        count_inner = 0
+        count_clipped = 0
+        count_candidates = 0
+        for f in source_roads.getFeatures(QgsFeatureRequest().setFilterRect(bbox)):
+            if model_feedback.isCanceled():
+                break
+            count_candidates += 1
+            geom = f.geometry()
+            if geom.isNull() or geom.isEmpty():
+                continue
+
+            box = geom.boundingBox()
+            col0, col1 = np.clip(np.floor((np.array([box.xMinimum(), box.xMaximum()]) - bbox.xMinimum()) / cell_size)
+                                 .astype(np.int64), 0, cols - 1)
+            row0, row1 = np.clip(np.floor((np.array([box.yMinimum(), box.yMaximum()]) - bbox.yMinimum()) / cell_size)
+                                 .astype(np.int64), 0, rows - 1)
+            covered = cells[row0:row1 + 1, col0:col1 + 1]
+            if (covered == CELL_INSIDE).all():
+                count_inner += 1
+            elif (covered == CELL_OUTSIDE).all():
+                continue
+            elif not engine.intersects(geom.constGet()):
+                continue
+            elif not engine.contains(geom.constGet()):
+                geom = QgsGeometry(engine.intersection(geom.constGet()))
+                if QgsWkbTypes.geometryType(geom.wkbType()) != QgsWkbTypes.LineGeometry:
+                    # Roads that only touch the buffer leave points behind
+                    geom = geom.convertToType(QgsWkbTypes.LineGeometry, True)
+                if geom.isNull() or geom.isEmpty():
+                    continue
+                count_clipped += 1
+
+            geom.convertToMultiType()
+            f_clipped = QgsFeature(f)
+            f_clipped.setGeometry(geom)
+            feats.append(f_clipped)
+        vlayer_clipped.dataProvider().addFeatures(feats)
+
+        model_feedback.pushInfo(self.clipRoadNetworkToBuffer.__name__ +
+                                ": %d roads kept of %d index candidates (%d accepted inside, %d clipped)" % (
+                                    len(feats), count_candidates, count_inner, count_clipped))
+
+        context.temporaryLayerStore().addMapLayer(vlayer_clipped)
+        return vlayer_clipped.id()
+
     def generateBufferAroundLayer(
         self,
         parameters,
         context,
         model_feedback,
+        tracker,
         buffer_distance,
         vlayer_base
     ):
@@ -470,12 +3020,27 @@ class FCServiceAreaV30(QgsProcessingAlgorithm):
             'MITER_LIMIT': 2,
             'SEGMENTS': 5,
             # 'OUTPUT': QgsProcessing.TEMPORARY_OUTPUT
-            'OUTPUT': parameters['ClipBuffer'] if 'ClipBuffer' in parameters else QgsProcessing.TEMPORARY_OUTPUT
+            'OUTPUT': parameters['ClipBuffer'] if 'ClipBuffer' in parameters else self.getIntermediateOutput(parameters, context)
         }
-        return processing.run(
-            'native:buffer', alg_params, context=context, feedback=model_feedback, is_child_algorithm=True
+        return self.runChildAlgorithm(
+            tracker, 'native:buffer', alg_params, context, model_feedback
         )['OUTPUT']
 
+    def getResultsLayerTreeGroup(self):
+        """
+        'Results' group of the project layer tree, created on demand. None when there's no QGIS GUI
+        (qgis_process, the command line runner), so headless runs never touch the layer tree.
+        """
+        from qgis.utils import iface
+        if iface is None:
+            return None
+
+        root = QgsProject().instance().layerTreeRoot()
+        lyrgroup = root.findGroup('Results')
+        if not lyrgroup:
+            lyrgroup = root.insertGroup(0, 'Results')
+        return lyrgroup
+
     def getLayerFeatureCount(self, context, layer_id):
         return context.getMapLayer(layer_id).dataProvider().featureCount()
 
@@ -493,3 +3058,112 @@ class FCServiceAreaV30(QgsProcessingAlgorithm):
 
     def createInstance(self):
         return FCServiceAreaV30()
+
+
+class FCConsoleFeedback(QgsProcessingFeedback):
+    """
+    Feedback for the command line runner: log lines go to stderr.
+    """
+
+    def pushInfo(self, info):
+        print(info, file=sys.stderr)
+
+    def pushWarning(self, warning):
+        print('WARNING: ' + warning, file=sys.stderr)
+
+    def reportError(self, error, fatalError=False):
+        print('ERROR: ' + error, file=sys.stderr)
+
+
+def main(argv=None):
+    """
+    Headless runner: no iface, no layer tree, no plugin GUI. Writes the service areas to a GeoPackage and
+    reports startup and startup-to-first-result times.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate tiered service areas around route sketches.')
+    parser.add_argument('--routes', required=True, help='Route sketch layer (file path or OGR uri)')
+    parser.add_argument('--roads', required=True, help='Road network line layer (file path or OGR uri)')
+    parser.add_argument('--output', required=True, help='Output GeoPackage')
+    parser.add_argument('--num-tiers', type=int, default=6)
+    parser.add_argument('--miles-per-tier', type=float, default=2)
+    parser.add_argument('--tier-minimums', default='$150|$200|$275|$350|$425|$500|$600|$700|$800')
+    parser.add_argument('--avg-speed', type=int, default=55)
+    parser.add_argument('--cell-size', type=int, default=50)
+    parser.add_argument('--thinning-fraction', type=float, default=0,
+                        help='Merge route points closer than this fraction of a tier (0 keeps every point)')
+    parser.add_argument('--cost-model', choices=['distance', 'generalized'], default='distance',
+                        help='generalized: $ per mile + $ per hour at road speed (multisource engine)')
+    parser.add_argument('--cost-per-mile', type=float, default=2)
+    parser.add_argument('--cost-per-hour', type=float, default=30)
+    parser.add_argument('--speed-field', default=None, help='Road speed field (mph), --avg-speed where missing')
+    parser.add_argument('--simplify', type=float, default=0, help='Tier boundary simplification tolerance (m)')
+    parser.add_argument('--min-part-area', type=float, default=0, help='Drop parts and holes below this area (m2)')
+    parser.add_argument('--engine', choices=['qneat3', 'multisource'], default='multisource',
+                        help='qneat3 needs the QNEAT3 provider (and SAGA with --overlap saga) to be available headless')
+    parser.add_argument('--overlap', choices=['native', 'saga'], default='native',
+                        help='qneat3 engine: resolve isochrone overlaps natively or with SAGA self-intersection')
+    parser.add_argument('--route-id-field', default=None, help='Batch mode: one route per distinct value')
+    parser.add_argument('--progressive', action='store_true', help='Write each tier as soon as it is done')
+    parser.add_argument('--tile-size', type=float, default=0,
+                        help='Tile size (mi) for statewide areas; 0 processes the area in one piece')
+    parser.add_argument('--in-memory', action='store_true', help='Keep intermediate layers in memory')
+    parser.add_argument('--no-graph-cache', action='store_true', help='Always rebuild the road graph')
+    parser.add_argument('--no-result-cache', action='store_true', help='Always recompute, even for unchanged inputs')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    qgs = QgsApplication([], False)
+    qgs.initQgis()
+    from processing.core.Processing import Processing
+    Processing.initialize()
+    time_ready = time.perf_counter()
+
+    output = args.output if args.output.lower().endswith('.gpkg') else args.output + '.gpkg'
+    parameters = {
+        'MainRouteSketch': args.routes,
+        'RoadNetwork': args.roads,
+        'ServiceAreas': output,
+        'NumTiers': args.num_tiers,
+        'MilesPerTier': args.miles_per_tier,
+        'TierMinimums': args.tier_minimums,
+        'CostAvgSpeed': args.avg_speed,
+        'CellSize': args.cell_size,
+        'ThinningFraction': args.thinning_fraction,
+        'SimplifyTolerance': args.simplify,
+        'MinPartArea': args.min_part_area,
+        'CostModel': FCServiceAreaV30.COST_GENERALIZED if args.cost_model == 'generalized' else FCServiceAreaV30.COST_DISTANCE,
+        'CostPerMile': args.cost_per_mile,
+        'CostPerHour': args.cost_per_hour,
+        'SpeedField': args.speed_field,
+        'Engine': FCServiceAreaV30.ENGINE_QNEAT3 if args.engine == 'qneat3' else FCServiceAreaV30.ENGINE_MULTISOURCE,
+        'OverlapResolution': FCServiceAreaV30.OVERLAP_SAGA if args.overlap == 'saga' else FCServiceAreaV30.OVERLAP_NATIVE,
+        'RouteIdField': args.route_id_field,
+        'ProgressiveTiers': args.progressive,
+        'TileSize': args.tile_size,
+        'InMemoryPipeline': args.in_memory,
+        'UseGraphCache': not args.no_graph_cache,
+        'UseResultCache': not args.no_result_cache
+    }
+
+    feedback = FCConsoleFeedback()
+    try:
+        processing.run(FCServiceAreaV30().create(), parameters, feedback=feedback)
+        status = 0
+    except QgsProcessingException as e:
+        feedback.reportError(str(e))
+        status = 1
+    time_result = time.perf_counter()
+
+    feedback.pushInfo('Startup (imports + QGIS init): %.2f s' % (time_ready - FC_STARTUP_TIME))
+    feedback.pushInfo('Startup to first result: %.2f s' % (time_result - FC_STARTUP_TIME))
+    if status == 0:
+        feedback.pushInfo('Service areas written to ' + output)
+
+    qgs.exitQgis()
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
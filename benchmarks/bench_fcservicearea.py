@@ -0,0 +1,466 @@
+"""
+Benchmarks for FCServiceAreaV30 on synthetic data, so pipeline changes can be measured offline and compared
+across commits without production road networks.
+
+Generates a grid and a random planar road network per scale (edge counts), with matching route sketches
+(a single route and a batch of routes with a ROUTEID field), then times:
+ - each stage on its own: graph build, route simplification (snap to intersections), multi-source search,
+   tier geometries (cost surface -> tier polygons), overlap resolution (min-tier attributes) and dissolve,
+   and the native minimum-tier union that replaces the last two
+ - the full pipeline, broken down by the algorithm's own stage profile (ProfileReport)
+
+Results are written as JSON with the git commit, so two runs can be diffed stage by stage.
+
+Run from a QGIS-enabled Python:
+    python benchmarks/bench_fcservicearea.py --scales 10000 100000 --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+import importlib.util
+try:
+    import resource
+except ImportError:
+    resource = None
+import numpy as np
+from osgeo import ogr
+from osgeo import osr
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_PATH = os.path.join(REPO_DIR, 'FCGenerateServiceAreas_v3.0.py')
+
+NETWORK_KINDS = ('grid', 'planar')
+DEFAULT_SCALES = (10000, 100000, 1000000)
+DEFAULT_EPSG = 32615
+EDGE_SPACING_M = 100.0
+SEGMENTS_PER_ROAD = 10
+BATCH_ROUTES = 4
+
+
+def loadScriptModule():
+    """
+    Imports the processing script by path: its file name holds a dot, so it can't be imported by name.
+    """
+    spec = importlib.util.spec_from_file_location('fc_servicearea_script', SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def getGitRevision():
+    def git(*args):
+        return subprocess.check_output(('git',) + args, cwd=REPO_DIR, stderr=subprocess.DEVNULL).decode().strip()
+    try:
+        return {'commit': git('rev-parse', 'HEAD'), 'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+def peakRss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def generateGridNetwork(edge_count, rng):
+    """
+    Square street grid with about edge_count edges. Returns node (x, y) and (u, v) edge index arrays.
+    """
+    side = max(int(round(np.sqrt(edge_count / 2.0))) + 1, 2)
+    gx, gy = np.meshgrid(np.arange(side), np.arange(side))
+    node_xy = np.column_stack((gx.ravel(), gy.ravel())).astype(np.float64) * EDGE_SPACING_M
+    node_id = np.arange(side * side).reshape(side, side)
+    edges = np.concatenate((
+        np.column_stack((node_id[:, :-1].ravel(), node_id[:, 1:].ravel())),
+        np.column_stack((node_id[:-1, :].ravel(), node_id[1:, :].ravel()))
+    ))
+    return node_xy, edges
+
+
+def generatePlanarNetwork(edge_count, rng):
+    """
+    Random planar network with about edge_count edges: jittered grid nodes, grid edges dropped at random and
+    at most one diagonal per cell (so no two edges cross). Irregular degrees and block shapes, like real roads.
+    """
+    keep = 0.85
+    diagonal = 0.3
+    side = max(int(round(np.sqrt(edge_count / (2 * keep + diagonal)))) + 1, 2)
+    gx, gy = np.meshgrid(np.arange(side), np.arange(side))
+    jitter = rng.uniform(-0.3, 0.3, size=(side * side, 2))
+    node_xy = (np.column_stack((gx.ravel(), gy.ravel())) + jitter) * EDGE_SPACING_M
+    node_id = np.arange(side * side).reshape(side, side)
+
+    grid_edges = np.concatenate((
+        np.column_stack((node_id[:, :-1].ravel(), node_id[:, 1:].ravel())),
+        np.column_stack((node_id[:-1, :].ravel(), node_id[1:, :].ravel()))
+    ))
+    grid_edges = grid_edges[rng.random(len(grid_edges)) < keep]
+
+    cells = node_id[:-1, :-1].ravel()
+    cells = cells[rng.random(len(cells)) < diagonal]
+    rising = rng.random(len(cells)) < 0.5
+    diag_edges = np.where(
+        rising[:, None],
+        np.column_stack((cells, cells + side + 1)),
+        np.column_stack((cells + 1, cells + side))
+    )
+    return node_xy, np.concatenate((grid_edges, diag_edges))
+
+
+def generateRouteSketches(node_xy, rng, route_count, steps=40):
+    """
+    Random-walk polylines across the network extent, one per route.
+    """
+    xy_min = node_xy.min(axis=0)
+    xy_max = node_xy.max(axis=0)
+    extent = xy_max - xy_min
+    routes = []
+    for _ in range(route_count):
+        start = xy_min + extent * rng.uniform(0.3, 0.7, size=2)
+        step = extent * 0.2 / steps
+        walk = np.cumsum(rng.normal(0, 1, size=(steps, 2)) * step + step * 0.5, axis=0)
+        routes.append(np.clip(start + walk, xy_min, xy_max))
+    return routes
+
+
+def writeRoadLayer(path, node_xy, edges, epsg):
+    """
+    Writes edges as road lines of up to SEGMENTS_PER_ROAD consecutive segments (runs of edges that chain
+    end to start), like a real road layer where one feature spans several intersections.
+    """
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(epsg)
+    ds = ogr.GetDriverByName('GPKG').CreateDataSource(path)
+    lyr = ds.CreateLayer('roads', srs, ogr.wkbLineString)
+    ds.StartTransaction()
+    line = None
+    line_segments = 0
+    last_v = None
+    for u, v in edges.tolist():
+        if line is None or u != last_v or line_segments >= SEGMENTS_PER_ROAD:
+            if line is not None:
+                f = ogr.Feature(lyr.GetLayerDefn())
+                f.SetGeometry(line)
+                lyr.CreateFeature(f)
+            line = ogr.Geometry(ogr.wkbLineString)
+            line.AddPoint_2D(*node_xy[u])
+            line_segments = 0
+        line.AddPoint_2D(*node_xy[v])
+        line_segments += 1
+        last_v = v
+    if line is not None:
+        f = ogr.Feature(lyr.GetLayerDefn())
+        f.SetGeometry(line)
+        lyr.CreateFeature(f)
+    ds.CommitTransaction()
+    ds = None
+
+
+def writeRouteLayer(path, routes, epsg):
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(epsg)
+    ds = ogr.GetDriverByName('GPKG').CreateDataSource(path)
+    lyr = ds.CreateLayer('routes', srs, ogr.wkbLineString)
+    lyr.CreateField(ogr.FieldDefn('ROUTEID', ogr.OFTInteger))
+    for route_id, route_xy in enumerate(routes):
+        line = ogr.Geometry(ogr.wkbLineString)
+        for x, y in route_xy.tolist():
+            line.AddPoint_2D(x, y)
+        f = ogr.Feature(lyr.GetLayerDefn())
+        f.SetField('ROUTEID', route_id)
+        f.SetGeometry(line)
+        lyr.CreateFeature(f)
+    ds = None
+
+
+class BenchTimer:
+    """
+    Times one stage: wall and CPU seconds and process peak RSS, plus the peak Python/NumPy heap when
+    trace_memory is on. tracemalloc slows allocation-heavy stages (the pure-Python search) several-fold, so
+    timings of traced runs don't compare with untraced runs or with the pipeline's own profile.
+    """
+
+    trace_memory = False
+
+    def __init__(self, results, name, items=None, unit=None):
+        self.results = results
+        self.record = {'stage': name, 'items': items, 'unit': unit}
+
+    def __enter__(self):
+        if self.trace_memory:
+            tracemalloc.start()
+        self.time_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.time_start
+        self.record['wall_seconds'] = seconds
+        self.record['cpu_seconds'] = time.process_time() - self.cpu_start
+        self.record['peak_heap_bytes'] = None
+        if self.trace_memory:
+            self.record['peak_heap_bytes'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        self.record['peak_rss_bytes'] = peakRss()
+        if self.record['items'] is not None and seconds > 0:
+            self.record['throughput'] = self.record['items'] / seconds
+        self.record['error'] = None if exc is None else '%s: %s' % (exc_type.__name__, exc)
+        self.results.append(self.record)
+        print('  %-28s %9.2f s %s' % (
+            self.record['stage'], seconds,
+            '' if self.record.get('throughput') is None else
+            '%.0f %s/s' % (self.record['throughput'], self.record['unit'])), file=sys.stderr)
+        return False
+
+
+def benchStages(module, alg, context, feedback, case, params, stages):
+    """
+    Runs each stage on its own, feeding it the previous stage's output, and appends the records to stages.
+    """
+    from qgis.core import QgsVectorLayer
+    from qgis.core import QgsFeature
+    from qgis.core import QgsGeometry
+    from qgis.core import QgsFeatureRequest
+    import processing
+
+    layer_roads = QgsVectorLayer(case['roads'], 'roads', 'ogr')
+    parameters = dict(params, MainRouteSketch=case['routes'], RoadNetwork=case['roads'])
+    tier_count = params['NumTiers']
+    tiercost_step = alg.convertMilesToMeters(params['MilesPerTier'])
+
+    with BenchTimer(stages, 'buildRoadGraph', case['edges'], 'edges') as record:
+        graph = module.FCRoadGraph.fromLineLayer(layer_roads)
+        record['items'] = graph.edgeCount()
+
+    with BenchTimer(stages, 'snapSketchToIntersections', None, 'intersections') as record:
+        intersections_xy = graph.node_xy[graph.junctionNodes()]
+        record['items'] = len(intersections_xy)
+        routepoints = context.getMapLayer(alg.snapSketchToIntersections(
+            parameters, context, feedback, alg.getIntersectionGrid(intersections_xy), layer_roads.crs(), 'UNIQUEID',
+            QgsFeatureRequest().setFilterExpression('"ROUTEID" = 0')))
+
+    routepoints_xy = [(f.geometry().asPoint().x(), f.geometry().asPoint().y()) for f in routepoints.getFeatures()]
+    source_nodes = graph.nearestNodes(routepoints_xy, alg.ROUTEPOINT_SNAP_M)
+    source_nodes = np.unique(source_nodes[source_nodes >= 0])
+
+    with BenchTimer(stages, 'multiSourceDijkstra', None, 'nodes') as record:
+        node_cost = graph.multiSourceDijkstra(source_nodes, tiercost_step * (tier_count + 1))
+        record['items'] = int(np.isfinite(node_cost).sum())
+
+    tracker = module.FCStageTracker(False)
+    with BenchTimer(stages, 'tierGeometries', tier_count, 'tiers') as record:
+        tier_geoms = alg.generateTierGeometriesFromNodeCost(
+            parameters, context, feedback, tracker, graph, node_cost, layer_roads.crs(), tier_count, tiercost_step)
+        record['vertices'] = sum(geom.constGet().nCoordinates() for geom in tier_geoms.values())
+
+    # Overlap resolution input: every route point's own nested tier rings, overlapping their neighbours', with
+    # the '|'-joined tier id the self-intersection step produces. The native union reads the same polygons
+    # with QNEAT3's plain per-tier id instead.
+    layer_overlaps = QgsVectorLayer('Polygon?field=ID:string', 'overlaps', 'memory')
+    layer_overlaps.setCrs(layer_roads.crs())
+    layer_isochrones = QgsVectorLayer('Polygon?field=id:integer', 'isochrones', 'memory')
+    layer_isochrones.setCrs(layer_roads.crs())
+    feats = []
+    feats_isochrone = []
+    for x, y in routepoints_xy:
+        center = QgsGeometry.fromPointXY(module.QgsPointXY(x, y))
+        for tier_idx in range(tier_count):
+            f = QgsFeature()
+            f.setGeometry(center.buffer(tiercost_step * (tier_idx + 1), 8))
+            f_isochrone = QgsFeature(f)
+            f.setAttributes(['|'.join(str(t) for t in range(tier_idx, tier_count))])
+            f_isochrone.setAttributes([tier_idx])
+            feats.append(f)
+            feats_isochrone.append(f_isochrone)
+    layer_overlaps.dataProvider().addFeatures(feats)
+    layer_isochrones.dataProvider().addFeatures(feats_isochrone)
+    context.temporaryLayerStore().addMapLayer(layer_overlaps)
+
+    tier_specs = dict((tier_idx, {'tier_num': tier_idx + 1, 'tier_name': 'Tier %d' % (tier_idx + 1),
+                                  'order_minimum': None, 'travelcost_mi': 0.0, 'travelcost_m': 0.0})
+                      for tier_idx in range(tier_count))
+    output_tablefields = {
+        'tier_num': {'ftype': module.QVariant.Int, 'fname': 'TIERNUM'},
+        'tier_name': {'ftype': module.QVariant.String, 'fname': 'TIERNAME'},
+        'order_minimum': {'ftype': module.QVariant.String, 'fname': 'ORDERMIN'},
+        'travelcost_mi': {'ftype': module.QVariant.Double, 'fname': '1WAYMILES'},
+        'travelcost_m': {'ftype': module.QVariant.Double, 'fname': '1WAYMETERS'}
+    }
+    for v in output_tablefields.values():
+        v['qfieldobj'] = module.QgsField(v['fname'], v['ftype'])
+
+    with BenchTimer(stages, 'overlapResolution', len(feats), 'polygons'):
+        alg.writeMinimumTierAttributes(layer_overlaps, 'ID', '|', tier_specs, output_tablefields)
+
+    with BenchTimer(stages, 'dissolve', len(feats), 'polygons'):
+        processing.run('native:dissolve', {'INPUT': layer_overlaps, 'FIELD': ['TIERNUM'], 'OUTPUT': 'memory:'},
+                       context=context, feedback=feedback)
+
+    with BenchTimer(stages, 'minimumTierUnion', len(feats_isochrone), 'polygons'):
+        alg.unionMinimumTiers(feedback, layer_isochrones, 'id')
+
+
+def benchPipeline(module, context, feedback, case, params, engine, batch, workdir):
+    """
+    Full run through processing, broken down by the algorithm's ProfileReport.
+    """
+    import processing
+
+    report_path = os.path.join(workdir, 'profile_%s_%s.json' % (engine, 'batch' if batch else 'single'))
+    parameters = dict(
+        params,
+        MainRouteSketch=case['routes'],
+        RoadNetwork=case['roads'],
+        ServiceAreas=os.path.join(workdir, 'service_areas_%s.gpkg' % engine),
+        Engine=module.FCServiceAreaV30.ENGINE_QNEAT3 if engine == 'qneat3' else module.FCServiceAreaV30.ENGINE_MULTISOURCE,
+        RouteIdField='ROUTEID' if batch else None,
+        # Cold runs: cached graphs/costs/results from a previous run would hide the work being measured
+        UseGraphCache=False,
+        ReuseTierCosts=False,
+        UseResultCache=False,
+        ProfileReport=report_path
+    )
+    if not batch:
+        parameters['MainRouteSketch'] = case['routes'] + '|layername=routes|subset="ROUTEID" = 0'
+
+    record = {'engine': engine, 'batch': batch, 'error': None}
+    time_start = time.perf_counter()
+    try:
+        processing.run(module.FCServiceAreaV30().create(), parameters, context=context, feedback=feedback)
+    except Exception as e:
+        record['error'] = '%s: %s' % (type(e).__name__, e)
+    record['wall_seconds'] = time.perf_counter() - time_start
+    record['peak_rss_bytes'] = peakRss()
+    if record['error'] is None:
+        with open(report_path) as fp:
+            record['profile'] = json.load(fp)['stages']
+    print('  pipeline %-8s %-6s %9.2f s%s' % (
+        engine, 'batch' if batch else 'single', record['wall_seconds'],
+        '' if record['error'] is None else '  FAILED ' + record['error']), file=sys.stderr)
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark FCServiceAreaV30 on synthetic road networks.')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES), help='Edge counts')
+    parser.add_argument('--kinds', nargs='+', choices=NETWORK_KINDS, default=list(NETWORK_KINDS))
+    parser.add_argument('--engines', nargs='+', choices=['multisource', 'qneat3'], default=['multisource'],
+                        help='Pipeline engines; qneat3 needs the QNEAT3 and SAGA providers')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--epsg', type=int, default=DEFAULT_EPSG, help='Projected CRS (meters) of the data')
+    parser.add_argument('--no-stages', action='store_true', help='Only run the full pipeline')
+    parser.add_argument('--no-pipeline', action='store_true', help='Only run the individual stages')
+    parser.add_argument('--workdir', default=None, help='Keep generated data here (default: a temp dir)')
+    parser.add_argument('--output', default=None, help='JSON results file (default: stdout)')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Record peak heap per stage with tracemalloc (slows the stages it measures)')
+    args = parser.parse_args(argv)
+    BenchTimer.trace_memory = args.trace_memory
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    module = loadScriptModule()
+    from qgis.core import QgsApplication
+    from qgis.core import QgsProcessingContext
+    qgs = QgsApplication([], False)
+    qgs.initQgis()
+    from processing.core.Processing import Processing
+    Processing.initialize()
+
+    feedback = module.FCConsoleFeedback()
+    # The algorithm logs every step; the benchmark only prints its own summary lines
+    feedback.pushInfo = lambda info: None
+    params = {
+        'NumTiers': 6,
+        'MilesPerTier': 2,
+        'TierMinimums': '$150|$200|$275|$350|$425|$500',
+        'CostAvgSpeed': 55,
+        'CellSize': 50,
+        'RasterTierSurface': False,
+        'InMemoryPipeline': False
+    }
+
+    workdir_tmp = None
+    workdir = args.workdir
+    if workdir is None:
+        workdir_tmp = tempfile.TemporaryDirectory(prefix='fc_bench_')
+        workdir = workdir_tmp.name
+    os.makedirs(workdir, exist_ok=True)
+
+    report = {
+        'git': getGitRevision(),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'qgis': module.Qgis.QGIS_VERSION,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'trace_memory': args.trace_memory,
+        'parameters': params,
+        'cases': []
+    }
+
+    generators = {'grid': generateGridNetwork, 'planar': generatePlanarNetwork}
+    for kind in args.kinds:
+        for scale in args.scales:
+            rng = np.random.default_rng(args.seed)
+            case_dir = os.path.join(workdir, '%s_%d' % (kind, scale))
+            os.makedirs(case_dir, exist_ok=True)
+            print('%s network, %d edges' % (kind, scale), file=sys.stderr)
+
+            time_start = time.perf_counter()
+            node_xy, edges = generators[kind](scale, rng)
+            case = {
+                'kind': kind,
+                'scale': scale,
+                'nodes': len(node_xy),
+                'edges': len(edges),
+                'roads': os.path.join(case_dir, 'roads.gpkg'),
+                'routes': os.path.join(case_dir, 'routes.gpkg')
+            }
+            if not os.path.isfile(case['roads']):
+                writeRoadLayer(case['roads'], node_xy, edges, args.epsg)
+                writeRouteLayer(case['routes'], generateRouteSketches(node_xy, rng, BATCH_ROUTES), args.epsg)
+            case['generate_seconds'] = time.perf_counter() - time_start
+            del node_xy, edges
+
+            context = QgsProcessingContext()
+            if not args.no_stages:
+                case['stages'] = []
+                # A failing stage is recorded and ends this case's stages, other cases still run
+                try:
+                    benchStages(module, module.FCServiceAreaV30().create(), context, feedback, case, params,
+                                case['stages'])
+                except Exception as e:
+                    print('  stages FAILED %s: %s' % (type(e).__name__, e), file=sys.stderr)
+            if not args.no_pipeline:
+                case['pipeline'] = []
+                for engine in args.engines:
+                    case['pipeline'].append(benchPipeline(module, context, feedback, case, params, engine, False, case_dir))
+                    if engine == 'multisource':
+                        case['pipeline'].append(benchPipeline(module, context, feedback, case, params, engine, True, case_dir))
+            report['cases'].append(case)
+
+    report_json = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            fp.write(report_json)
+    else:
+        print(report_json)
+
+    qgs.exitQgis()
+    if workdir_tmp is not None:
+        workdir_tmp.cleanup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Loads the processing script for the tests. The tests cover its pure NumPy parts (road graph, network
+searches, tier id parsing), so when QGIS isn't installed its modules are replaced by empty placeholders
+and anything that needs QGIS itself is left to runs inside QGIS.
+"""
+
+import os
+import sys
+import types
+import importlib.util
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_PATH = os.path.join(REPO_DIR, 'FCGenerateServiceAreas_v3.0.py')
+QGIS_MODULES = ('qgis', 'qgis.core', 'qgis.analysis', 'qgis.utils', 'processing',
+                'PyQt5', 'PyQt5.QtCore', 'osgeo', 'osgeo.gdal', 'osgeo.ogr')
+
+
+def installQgisPlaceholders():
+    """
+    Every name imported from a placeholder module is a new empty class, so the script's class definitions
+    and module constants load; Qt signals and slots become no-ops.
+    """
+    for name in QGIS_MODULES:
+        module = types.ModuleType(name)
+        module.__getattr__ = lambda attr: type(attr, (), {})
+        sys.modules[name] = module
+    sys.modules['PyQt5.QtCore'].pyqtSignal = lambda *args: None
+    sys.modules['PyQt5.QtCore'].pyqtSlot = lambda *args: (lambda f: f)
+
+
+def loadScriptModule():
+    if importlib.util.find_spec('qgis') is None:
+        installQgisPlaceholders()
+    spec = importlib.util.spec_from_file_location('fc_servicearea_script', SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='session')
+def fcsa():
+    return loadScriptModule()
+
+
+@pytest.fixture(scope='session')
+def alg(fcsa):
+    return fcsa.FCServiceAreaV30()
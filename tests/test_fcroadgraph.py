@@ -0,0 +1,184 @@
+"""
+FCRoadGraph and the built-in engine's searches, checked against a plain heapq Dijkstra over the edge list.
+"""
+
+import heapq
+
+import numpy as np
+import pytest
+
+
+def makeRoadGraph(fcsa, size=40, seed=1):
+    """
+    Jittered size x size grid of 100 m blocks with a few diagonal shortcuts and random road speeds.
+    """
+    rng = np.random.default_rng(seed)
+    gx, gy = np.meshgrid(np.arange(size), np.arange(size))
+    node_xy = np.column_stack((gx.ravel(), gy.ravel())).astype(np.float64) * 100.0
+    node_xy += rng.uniform(-30, 30, node_xy.shape)
+    node_id = np.arange(size * size).reshape(size, size)
+    edges = np.concatenate((
+        np.column_stack((node_id[:, :-1].ravel(), node_id[:, 1:].ravel())),
+        np.column_stack((node_id[:-1, :].ravel(), node_id[1:, :].ravel())),
+        np.column_stack((node_id[:-1, :-1].ravel(), node_id[1:, 1:].ravel()))[rng.random((size - 1) ** 2) < 0.2]
+    ))
+    edge_len = np.hypot(*(node_xy[edges[:, 0]] - node_xy[edges[:, 1]]).T)
+    edge_speed = rng.uniform(20, 70, len(edges))
+    edge_speed[rng.random(len(edges)) < 0.1] = np.nan
+    return fcsa.FCRoadGraph.fromEdges(node_xy, edges[:, 0], edges[:, 1], edge_len, edge_speed)
+
+
+def referenceDijkstra(graph, source_nodes, edge_cost, cutoff):
+    adjacency = [[] for _ in range(graph.nodeCount())]
+    for u, v, c in zip(graph.edge_u.tolist(), graph.edge_v.tolist(), edge_cost.tolist()):
+        adjacency[u].append((v, c))
+        adjacency[v].append((u, c))
+    dist = np.full(graph.nodeCount(), np.inf)
+    heap = [(0.0, int(s)) for s in source_nodes]
+    for _, s in heap:
+        dist[s] = 0.0
+    heapq.heapify(heap)
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for v, c in adjacency[u]:
+            if d + c < dist[v] and d + c <= cutoff:
+                dist[v] = d + c
+                heapq.heappush(heap, (d + c, v))
+    return dist
+
+
+@pytest.fixture(scope='module')
+def graph(fcsa):
+    return makeRoadGraph(fcsa)
+
+
+@pytest.fixture(params=['distance', 'generalized'])
+def costs(request, graph):
+    """
+    (edge costs or None for plain distance, cutoff) per cost model.
+    """
+    if request.param == 'distance':
+        return None, 1500.0
+    return graph.generalizedEdgeCost(2.0, 30.0, 55.0), 3.0
+
+
+SOURCES = ([0], [5, 777, 1210], list(range(40, 48)))
+
+
+@pytest.mark.parametrize('source_nodes', SOURCES)
+def test_multisource_matches_reference(graph, costs, source_nodes):
+    edge_cost, cutoff = costs
+    expected = referenceDijkstra(graph, source_nodes, graph.edge_len if edge_cost is None else edge_cost, cutoff)
+    node_cost = graph.multiSourceDijkstra(source_nodes, cutoff, edge_cost)
+    np.testing.assert_array_equal(np.isfinite(node_cost), np.isfinite(expected))
+    np.testing.assert_allclose(node_cost[np.isfinite(node_cost)], expected[np.isfinite(expected)])
+
+
+@pytest.mark.parametrize('source_nodes', SOURCES)
+def test_threshold_pauses_match_trimmed_search(graph, costs, source_nodes):
+    edge_cost, cutoff = costs
+    node_cost_full = graph.multiSourceDijkstra(source_nodes, cutoff, edge_cost)
+    thresholds = [cutoff / 4, cutoff / 2, cutoff * 3 / 4, cutoff]
+    paused = list(graph.iterateMultiSourceDijkstra(source_nodes, thresholds, edge_cost))
+    assert [pause for pause, _ in paused] == list(range(len(thresholds)))
+    for pause, node_cost in paused:
+        expected = np.where(node_cost_full <= thresholds[pause], node_cost_full, np.inf)
+        np.testing.assert_array_equal(node_cost, expected)
+
+
+@pytest.mark.parametrize('source_nodes', SOURCES)
+def test_reach_clipped_search_matches_full(alg, graph, costs, source_nodes):
+    edge_cost, cutoff = costs
+    reach = alg.getCostReachMeters(graph, edge_cost, cutoff)
+    node_cost_full = graph.multiSourceDijkstra(source_nodes, cutoff, edge_cost)
+    np.testing.assert_array_equal(graph.multiSourceDijkstra(source_nodes, cutoff, edge_cost, reach=reach),
+                                  node_cost_full)
+
+    thresholds = [cutoff / 3, cutoff * 2 / 3, cutoff]
+    for (pause, node_cost), (pause_clipped, node_cost_clipped) in zip(
+            graph.iterateMultiSourceDijkstra(source_nodes, thresholds, edge_cost),
+            graph.iterateMultiSourceDijkstra(source_nodes, thresholds, edge_cost, reach=reach)):
+        assert pause == pause_clipped
+        np.testing.assert_array_equal(node_cost, node_cost_clipped)
+
+
+def test_route_worker_returns_full_graph_indices(fcsa, alg, graph, costs):
+    edge_cost, cutoff = costs
+    source_nodes = np.array([5, 777, 1210])
+    node_cost = graph.multiSourceDijkstra(source_nodes, cutoff, edge_cost)
+    route_id, reached, reached_cost = fcsa.searchRouteNodeCostsWorker(
+        'r', source_nodes, cutoff, alg.getCostReachMeters(graph, edge_cost, cutoff), graph, edge_cost)
+    assert route_id == 'r'
+    np.testing.assert_array_equal(reached, np.flatnonzero(np.isfinite(node_cost)))
+    np.testing.assert_array_equal(reached_cost, node_cost[reached])
+
+
+@pytest.mark.parametrize('reach', [50.0, 250.0, 900.0])
+def test_nodes_within_reach_covers_disks(graph, reach):
+    source_nodes = np.array([5, 777, 1210])
+    mask = graph.nodesWithinReach(source_nodes, reach)
+    dist = np.min(np.hypot(graph.node_xy[:, None, 0] - graph.node_xy[source_nodes, 0],
+                           graph.node_xy[:, None, 1] - graph.node_xy[source_nodes, 1]), axis=1)
+    assert mask[dist <= reach].all()
+    assert not mask[dist > 3 * reach].any()
+
+
+def test_subgraph_maps_nodes_and_edges(graph):
+    node_mask = graph.node_xy[:, 0] < 1500
+    subgraph, nodes, edges = graph.subgraph(node_mask)
+    np.testing.assert_array_equal(nodes, np.flatnonzero(node_mask))
+    np.testing.assert_array_equal(subgraph.node_xy, graph.node_xy[nodes])
+    np.testing.assert_array_equal(nodes[subgraph.edge_u], graph.edge_u[edges])
+    np.testing.assert_array_equal(nodes[subgraph.edge_v], graph.edge_v[edges])
+    np.testing.assert_array_equal(subgraph.edge_len, graph.edge_len[edges])
+    assert node_mask[graph.edge_u[edges]].all() and node_mask[graph.edge_v[edges]].all()
+    both_inside = node_mask[graph.edge_u] & node_mask[graph.edge_v]
+    assert len(edges) == both_inside.sum()
+
+
+def test_tile_search_is_exact_inside_tile(fcsa, alg, graph, costs):
+    edge_cost, cutoff = costs
+    source_nodes = np.array([5, 777, 1210])
+    node_cost = graph.multiSourceDijkstra(source_nodes, cutoff, edge_cost)
+    reach = alg.getCostReachMeters(graph, edge_cost, cutoff)
+    node_x, node_y = graph.node_xy[:, 0], graph.node_xy[:, 1]
+    sources_xy = graph.node_xy[source_nodes]
+    tile_size = 1000.0
+    # The same tiles getSearchTiles lays out: a tile_size grid, each tile searched within reach around it
+    for tile_idx, (x0, y0) in enumerate((x, y) for x in np.arange(0, 4000, tile_size)
+                                        for y in np.arange(0, 4000, tile_size)):
+        x1, y1 = x0 + tile_size, y0 + tile_size
+        bounds = (x0 - reach, y0 - reach, x1 + reach, y1 + reach)
+        in_bounds = ((sources_xy[:, 0] >= bounds[0]) & (sources_xy[:, 0] <= bounds[2]) &
+                     (sources_xy[:, 1] >= bounds[1]) & (sources_xy[:, 1] <= bounds[3]))
+        if not in_bounds.any():
+            continue
+        tile_searched = fcsa.searchTileNodeCostsWorker(
+            tile_idx, bounds, source_nodes[in_bounds], cutoff, graph, edge_cost)
+        assert tile_searched[0] == tile_idx
+        in_tile = np.flatnonzero((node_x >= x0) & (node_x <= x1) & (node_y >= y0) & (node_y <= y1))
+        tile_cost = np.full(graph.nodeCount(), np.inf)
+        tile_cost[tile_searched[1]] = tile_searched[2]
+        np.testing.assert_array_equal(tile_cost[in_tile], node_cost[in_tile])
+
+
+def test_junction_nodes(fcsa):
+    # Road A (0-1-2) joins road B (2-3) end to end at node 2, road C (4-1-5) crosses A at node 1, node 3 and
+    # the ends of C are dead ends
+    node_xy = np.array([(0, 0), (5, 0), (10, 0), (20, 0), (5, -5), (5, 5)], dtype=np.float64)
+    edge_u = np.array([0, 1, 2, 4, 1])
+    edge_v = np.array([1, 2, 3, 1, 5])
+    edge_len = np.hypot(*(node_xy[edge_u] - node_xy[edge_v]).T)
+    node_line_ends = np.bincount([0, 2, 2, 3, 4, 5], minlength=len(node_xy))
+    graph = fcsa.FCRoadGraph.fromEdges(node_xy, edge_u, edge_v, edge_len, None, node_line_ends)
+    np.testing.assert_array_equal(graph.junctionNodes(), [1, 2])
+    subgraph, nodes, _ = graph.subgraph(np.ones(len(node_xy), dtype=bool))
+    np.testing.assert_array_equal(nodes[subgraph.junctionNodes()], [1, 2])
+
+
+def test_parse_minimum_tier_ids(alg):
+    tier_min = alg.parseMinimumTierIds(['2|0|1', '', '3', '5|4', '', '7|7|6|8'], '|')
+    np.testing.assert_array_equal(tier_min, [0, -1, 3, 4, -1, 6])
+    np.testing.assert_array_equal(alg.parseMinimumTierIds(['', ''], '|'), [-1, -1])